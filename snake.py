@@ -37,7 +37,11 @@ SOFTWARE.
 # -----------------------------------------------------------------------------
 # Public Libraries
 import os
+import sys
 import math
+import argparse
+import functools
+import multiprocessing
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 import pygame
 import neat
@@ -49,16 +53,31 @@ from PIL import Image
 # Utils Folder files
 from utils import UI, confmodif
 from utils import visualize
+from utils import evaluate
+from utils import batch_env
+from utils import compiled_net
+from utils import observation
+from utils import fitness_cache
+from utils import checkpoint
+from utils import replay
+from utils import render
+from utils import game
+from utils.game import Snake, Food
+
+# Headless training never opens a window, pumps events or loads fonts
+# (also checked by worker processes re-importing this file)
+HEADLESS = "--headless" in sys.argv
 
 # -----------------------------------------------------------------------------
 # Pygame and font initialization
 # -----------------------------------------------------------------------------
-pygame.init()
-pygame.font.init()
+if not HEADLESS:
+    pygame.init()
+    pygame.font.init()
 
-# Caption and Icon
-pygame.display.set_caption("Snake AI")
-# icon already set to snake by default
+    # Caption and Icon
+    pygame.display.set_caption("Snake AI")
+    # icon already set to snake by default
 
 # -----------------------------------------------------------------------------
 # Constants and global variables
@@ -67,57 +86,64 @@ WIN_WIDTH = 800
 GAME_WIN_WIDTH = 600
 GAME_WIN_HEIGHT = 600
 FPS = 30
+HUMAN_FPS = 15  # Snake moves one cell per tick, keep it playable
+
+# Load Window and Menu Button (Not Needed Headless)
+win = None
+human_menu = None
+ai_menu = None
+return_grid = None
+
+if not HEADLESS:
+    win = UI.Window(WIN_WIDTH, GAME_WIN_HEIGHT)
+    human_menu = UI.Button(
+        # Top right under score count (SEE DISPLAY FUNCTIONS)
+        x=WIN_WIDTH - 10 - 120,
+        y=50,
+        w=120,
+        h=35,
+        param_options={
+            'curve': 0.3,
+            'text': "Menu",
+            'font_colour': (255, 255, 255),
+            'background_color': (200, 200, 200),
+            'hover_background_color': (160, 160, 160),
+            'outline_half': False
+        }
+    )
+
+    ai_menu = UI.Button(
+        # Top right under score count (SEE DISPLAY FUNCTIONS)
+        x=WIN_WIDTH - 10 - 120,
+        y=100,
+        w=120,
+        h=35,
+        param_options={
+            'curve': 0.3,
+            'text': "Menu",
+            'font_colour': (255, 255, 255),
+            'background_color': (200, 200, 200),
+            'hover_background_color': (160, 160, 160),
+            'outline_half': False
+        }
+    )
 
-# Load Window and Menu Button
-win = UI.Window(WIN_WIDTH, GAME_WIN_HEIGHT)
-human_menu = UI.Button(
-    # Top right under score count (SEE DISPLAY FUNCTIONS)
-    x=WIN_WIDTH - 10 - 120,
-    y=50,
-    w=120,
-    h=35,
-    param_options={
-        'curve': 0.3,
-        'text': "Menu",
-        'font_colour': (255, 255, 255),
-        'background_color': (200, 200, 200),
-        'hover_background_color': (160, 160, 160),
-        'outline_half': False
-    }
-)
-
-ai_menu = UI.Button(
-    # Top right under score count (SEE DISPLAY FUNCTIONS)
-    x=WIN_WIDTH - 10 - 120,
-    y=100,
-    w=120,
-    h=35,
-    param_options={
-        'curve': 0.3,
-        'text': "Menu",
-        'font_colour': (255, 255, 255),
-        'background_color': (200, 200, 200),
-        'hover_background_color': (160, 160, 160),
-        'outline_half': False
-    }
-)
-
-# AI Enlargement Return to grid
-return_grid = UI.Button(
-    # Bottom right under Neural Net Image count (SEE DISPLAY FUNCTIONS)
-    x=WIN_WIDTH - 10 - 120,
-    y=GAME_WIN_HEIGHT - 35 - 10,
-    w=120,
-    h=35,
-    param_options={
-        'curve': 0.3,
-        'text': "Back",
-        'font_colour': (255, 255, 255),
-        'background_color': (200, 200, 200),
-        'hover_background_color': (160, 160, 160),
-        'outline_half': False
-    }
-)
+    # AI Enlargement Return to grid
+    return_grid = UI.Button(
+        # Bottom right under Neural Net Image count (SEE DISPLAY FUNCTIONS)
+        x=WIN_WIDTH - 10 - 120,
+        y=GAME_WIN_HEIGHT - 35 - 10,
+        w=120,
+        h=35,
+        param_options={
+            'curve': 0.3,
+            'text': "Back",
+            'font_colour': (255, 255, 255),
+            'background_color': (200, 200, 200),
+            'hover_background_color': (160, 160, 160),
+            'outline_half': False
+        }
+    )
 
 # Generation Count and Image Display
 gen = 0
@@ -149,280 +175,91 @@ snakes = 16
 # AI Block Enlargement
 block_enlargement = False
 
-# Load Fonts
-STAT_FONT = pygame.font.SysFont("comicsans", 50)
-STAT_FONT_SMALL = pygame.font.SysFont("comicsans", 30)
-STAT_FONT_BIG = pygame.font.SysFont("comicsans", 100)
+# Renderer of the AI Grid (Built on First Draw) and Its Kind: 'dirty' Repaints
+# What Changed, 'array' Draws Every Board From One Array (See utils/render.py)
+renderer = None
+renderer_name = 'dirty'
 
-# -----------------------------------------------------------------------------
-# Classes
-# -----------------------------------------------------------------------------
-class Snake:
-    # division of constants to fit into one block of many snakes
-    ratio = 1
-    vel = 15
-    grid_sys = 30
+# Starvation Timeout: Ticks Without Food and Extra Ticks per Body Block
+timeout = [evaluate.TIMEOUT_TICKS, evaluate.TIMEOUT_TICKS_PER_BLOCK]
 
-    # snake body
-    x = []
-    y = []
+# Network Inputs (Feature Set Name, See utils/observation.py)
+features = 'classic'
 
-    def __init__(self, x, y, wb, we, hb, he):
-        global blocks
+# Master Seed of the Food Positions (None: Random Games) and Fitness Cache Size
+seed = None
+cache_size = fitness_cache.CACHE_SIZE
 
-        # Calibrating constants to fit each block
-        self.ratio = math.sqrt(blocks)
-        self.vel = self.vel / self.ratio
-        self.grid_sys = self.grid_sys / self.ratio
+# Headless Episodes per Genome, Averaged, and Percentile of the Generation a
+# Genome Must Reach to Play Its Next One (None: Play Them All)
+episodes = 1
+cutoff = None
 
-        """
-        # Starting with 3 blocks
-        self.x = [
-                    (x/self.ratio),
-                    (x/self.ratio),
-                    (x/self.ratio)
-                ]
-        self.y = [
-                    (y/self.ratio),
-                    (y/self.ratio) + (self.grid_sys/2),
-                    (y/self.ratio) + self.grid_sys
-                ]
-        """
+# Checkpoints: Every x Generations / y Seconds (None: Never) and File Prefix
+checkpoint_every = [None, None]
+checkpoint_prefix = checkpoint.FILENAME_PREFIX
 
-        # Starting with 3 blocks
-        self.x = [
-                    x,
-                    x,
-                    x
-                ]
-        self.y = [
-                    y,
-                    y + (self.grid_sys/2),
-                    y + self.grid_sys
-                ]
-
-        # snake direction
-        self.direction = "Up"
-
-        # Chosen to be enlarged
-        self.chosen = False
-
-        # block dimensions
-        self.width_end = we
-        self.height_end = he
-        self.width_begin = wb
-        self.height_begin = hb
-
-    def move_right(self):
-        # if self.x[0] % self.grid_sys == 0 and self.y[0] % self.grid_sys == 0 and self.direction != "Left":
-        # We want everything to be in the same "grid"
-        if self.x[0] % self.grid_sys == 0 and self.y[0] % self.grid_sys == 0:
-            self.direction = "Right"
-
-    def move_left(self):
-        # if self.x[0] % self.grid_sys == 0 and self.y[0] % self.grid_sys == 0 and self.direction != "Right":
-        if self.x[0] % self.grid_sys == 0 and self.y[0] % self.grid_sys == 0:
-            self.direction = "Left"
-
-    def move_up(self):
-        # if self.x[0] % self.grid_sys == 0 and self.y[0] % self.grid_sys == 0 and self.direction != "Down":
-        if self.x[0] % self.grid_sys == 0 and self.y[0] % self.grid_sys == 0:
-            self.direction = "Up"
-
-    def move_down(self):
-        # if self.x[0] % self.grid_sys == 0 and self.y[0] % self.grid_sys == 0 and self.direction != "Up":
-        if self.x[0] % self.grid_sys == 0 and self.y[0] % self.grid_sys == 0:
-            self.direction = "Down"
-
-    def move(self):
-
-        for n in range(len(self.x) - 1, 0, -1):
-            self.x[n] = self.x[n - 1]
-            self.y[n] = self.y[n - 1]
-
-        # if not self.y == 0 and self.direction == "Up": # Force snake not to hit wall
-        if self.direction == "Up":
-            self.y[0] = self.y[0] - self.vel
-
-        # if not self.y == GAME_WIN_HEIGHT - 30 and self.direction == "Down":
-        if self.direction == "Down":
-            self.y[0] = self.y[0] + self.vel
-
-        # if not self.x == GAME_WIN_WIDTH - 30 and self.direction == "Right":
-        if self.direction == "Right":
-            self.x[0] = self.x[0] + self.vel
-
-        # if not self.x == 0 and self.direction == "Left":
-        if self.direction == "Left":
-            self.x[0] = self.x[0] - self.vel
-
-    def wall_collision(self):
-        return (
-                self.y[0] < self.height_begin
-                or (self.y[0] == self.height_end - self.vel and self.direction == "Down")
-                or self.x[0] < self.width_begin
-                or (self.x[0] == self.width_end - self.vel and self.direction == "Right")
-                )
+# Spectator Mode: Simulation Runs Flat Out, Frames Drawn at FPS or Every x
+# Ticks (None: FPS). Turbo (T Key) Stops Drawing Altogether
+spectator = [False, None]
+turbo = False
 
-    def snake_collision(self):
-        # Make list of box coordinates sublist
-        tmp = []
-        for n in range(len(self.x)):
-            tmp.append([self.x[n], self.y[n]])
-
-        # Checks for duplicate sublists
-        return not len([list(i) for i in set(map(tuple, tmp))]) == len(tmp)
-
-    def get_last_block(self):
-        return (self.x[len(self.x) - 1], self.y[len(self.y) - 1])
-
-    def get_coord_head(self):
-        return (self.x[0], self.y[0])
-
-    def get_body(self):
-        return (self.x, self.y)
-
-    def get_w_h(self):
-        return (self.width_end, self.height_end, self.width_begin, self.height_begin)
-
-    def get_ratio(self):
-        return self.ratio
-
-    def get_chosen(self):
-        return self.chosen
-
-    def set_chosen(self, c):
-        self.chosen = c
-
-    def add_block(self, xadd, yadd):
-        self.x.append(xadd)
-        self.y.append(yadd)
-
-    def dis_to_snake_or_wall(self):
-        left = self.width_begin
-        right = self.width_end
-        top = self.height_begin
-        bottom = self.height_end
-
-        # we want closest block not farthest
-        leftflag = True
-        rightflag = True
-        topflag = True
-        bottomflag = True
-
-        # Snake
-        for n in range(1, len(self.x)):  # Don't include head
-            if self.y[n] == self.y[0]:
-                if self.x[n] < self.x[0] and leftflag:
-                    left = self.x[0] - self.x[n]
-                    leftflag = False
-                if self.x[n] > self.x[0] and rightflag:
-                    right = self.x[n] - self.x[0]
-                    rightflag = False
-
-            if self.x[n] == self.x[0]:
-                if self.y[n] < self.y[0] and topflag:
-                    top = self.y[0] - self.y[n]
-                    topflag = False
-                if self.y[n] > self.y[0] and bottomflag:
-                    bottom = self.y[n] - self.y[0]
-                    bottomflag = False
-
-        # Wall IF NO SNAKE
-        if left == self.width_begin:
-            left = self.x[0] - self.width_begin
-        if right == self.width_end:
-            right = self.width_end - self.x[0]
-        if top == self.height_begin:
-            top = self.y[0] - self.height_begin
-        if bottom == self.height_end:
-            bottom = self.height_end - self.y[0]
-
-        return (right, left, bottom, top)
-
-    def draw(self, win):
-        for n in range(len(self.x)):  # x has same length as y
-            pygame.draw.rect(win, (255, 255, 255), (self.x[n], self.y[n], self.grid_sys, self.grid_sys))
-
-    def draw_enlarged(self, win):
-        for n in range(len(self.x)):  # x has same length as y
-            pygame.draw.rect(win, (255, 255, 255), ((self.x[n] - self.width_begin) * self.ratio, (self.y[n] - self.height_begin) * self.ratio, 30, 30))
-
-class Food:
-    # division of constants to fit into one block of many foods
-    ratio = 1
-    grid_sys = 30
-
-    def __init__(self, wb, we, hb, he):
-        # Calibrating constants to fit each block
-        self.ratio = math.sqrt(blocks)
-        self.grid_sys = self.grid_sys / self.ratio
-
-        # block dimensions
-        self.width_end = we
-        self.height_end = he
-        self.width_begin = wb
-        self.height_begin = hb
-
-        self.x = random.randrange(
-                                    100 * self.width_begin,
-                                    100 * self.width_end,
-                                    100 * self.grid_sys  # We want everything to be in the same "grid"
-                                ) / 100  # Accounting float for larger block num
-        self.y = random.randrange(
-                                    100 * self.height_begin,
-                                    100 * self.height_end,
-                                    100 * self.grid_sys
-                                ) / 100
-
-    def new(self, snake):
-
-        not_satisfied = True
-        while not_satisfied:
-            self.x = random.randrange(
-                                        100 * self.width_begin,
-                                        100 * self.width_end,
-                                        100 * self.grid_sys
-                                    ) / 100
-            self.y = random.randrange(
-                                        100 * self.height_begin,
-                                        100 * self.height_end,
-                                        100 * self.grid_sys
-                                    ) / 100
-
-            # Check if not in same position as snake body
-            tmp = []
-            # Make Snake Body 2D Array
-            (xbody, ybody) = snake.get_body()
-            for n in range(len(xbody)):
-                tmp.append([xbody[n], ybody[n]])
-            # Add food in array and check if two coordinates are the same
-            tmp.append([self.x, self.y])
-            # If two coordinates are the same we make new food again
-            if len([list(i) for i in set(map(tuple, tmp))]) == len(tmp):
-                not_satisfied = False
-
-    def eaten(self, snake):
-        (snakex, snakey) = snake.get_coord_head()
-        return self.x == snakex and self.y == snakey
-
-    def distance_to_food(self, snake):
-        (headx, heady) = snake.get_coord_head()
+# Folder Receiving a Replay of Every Generation's Champion (None: No Replays)
+replays = None
 
-        """
-        x = (self.x - headx) ** 2
-        y = (self.y - heady) ** 2
+# Fitness Lost by Snakes Going in Circles, Ended Early (None: Let Them Starve)
+loop_penalty = evaluate.LOOP_PENALTY
 
-        return math.sqrt(x + y)
-        """
+# Load Fonts
+STAT_FONT = None
+STAT_FONT_SMALL = None
+STAT_FONT_BIG = None
 
-        return (self.x - headx, self.y - heady)
+if not HEADLESS:
+    STAT_FONT = render.font("comicsans", 50)
+    STAT_FONT_SMALL = render.font("comicsans", 30)
+    STAT_FONT_BIG = render.font("comicsans", 100)
 
-    def draw(self, win):
-        pygame.draw.rect(win, (255, 0, 0), (self.x, self.y, self.grid_sys, self.grid_sys))
+# -----------------------------------------------------------------------------
+# Classes
+# -----------------------------------------------------------------------------
+class AgentTable:
+    """
+    State of every genome playing in main_ai, one list per field indexed by
+    agent. Indices never move when a snake dies: alive marks it dead and live,
+    the indices still playing, is compacted once per tick.
+    """
 
-    def draw_enlarged(self, win):
-        pygame.draw.rect(win, (255, 0, 0), ((self.x - self.width_begin) * self.ratio, (self.y - self.height_begin) * self.ratio, 30, 30))
+    def __init__(self):
+        self.snake = []
+        self.food = []
+        self.net = []
+        self.genome = []
+        self.ticks = []  # Since last food
+        self.visited = []  # Packed states since last food
+        self.score = []
+        self.alive = []
+
+        self.live = []
+
+    def add(self, snake, food, net, genome):
+        self.live.append(len(self.snake))
+
+        self.snake.append(snake)
+        self.food.append(food)
+        self.net.append(net)
+        self.genome.append(genome)
+        self.ticks.append(0)
+        self.visited.append(set())
+        self.score.append(0)
+        self.alive.append(True)
+
+    def compact(self):
+        self.live = [x for x in self.live if self.alive[x]]
+
+    def column(self, field):
+        # Values of the live agents only
+        return [field[x] for x in self.live]
 
 # -----------------------------------------------------------------------------
 # Methods
@@ -550,23 +387,20 @@ def draw_window_human(win, snake, food, score, pregame):
                         )
 
     # Draw Current Score
-    text = STAT_FONT.render("Score: " + str(score), 1, (255, 255, 255))
+    text = render.text(STAT_FONT, "Score: " + str(score), (255, 255, 255))
     win.blit(text, (WIN_WIDTH - 10 - text.get_width(), 10))
 
     if pregame:
         # Draw Transparency Over Game
-        transparency_size = (WIN_WIDTH, GAME_WIN_HEIGHT)
-        transparency = pygame.Surface(transparency_size)
-        transparency.set_alpha(150)
-        win.blit(transparency, (0, 0))
+        win.blit(render.overlay((WIN_WIDTH, GAME_WIN_HEIGHT), 150), (0, 0))
 
         # Main Text
-        text = STAT_FONT_BIG.render("Press Arrow Key", 1, (255, 255, 255))
+        text = render.text(STAT_FONT_BIG, "Press Arrow Key", (255, 255, 255))
         win.blit(text, (GAME_WIN_WIDTH/2 - text.get_width() /
                  2, GAME_WIN_HEIGHT/2 - text.get_height()))
 
         # Saved High Score
-        text = STAT_FONT.render("High Score: " + str(hs_genopt_popopt_backgrid[0]), 1, (255, 0, 0))
+        text = render.text(STAT_FONT, "High Score: " + str(hs_genopt_popopt_backgrid[0]), (255, 0, 0))
         win.blit(text, (GAME_WIN_WIDTH/2- text.get_width()/2, GAME_WIN_HEIGHT/2 + 100))
 
     # Return To Menu if Menu Button Pressed / Draw menu button
@@ -588,30 +422,27 @@ def main_human():
     global blocks
     global snakes
 
-    # reset addition counter to 0
-    block_count = 0
-
     # reset block and snakes to 1
     blocks = 1
     snakes = 1
 
-    xsaved = 0
-    ysaved = 0
-
     # Set Variables
     snake = Snake(
-                    GAME_WIN_WIDTH / 2,
-                    GAME_WIN_HEIGHT / 2,
+                    game.BOARD_SIZE // 2,
+                    game.BOARD_SIZE // 2,
                     0,
                     GAME_WIN_WIDTH,
                     0,
-                    GAME_WIN_HEIGHT
+                    GAME_WIN_HEIGHT,
+                    math.sqrt(blocks)
                 )
     food = Food(
                     0,
                     GAME_WIN_WIDTH,
                     0,
-                    GAME_WIN_HEIGHT
+                    GAME_WIN_HEIGHT,
+                    math.sqrt(blocks),
+                    snake=snake
                 )
 
     # win = pygame.display.set_mode((WIN_WIDTH, GAME_WIN_HEIGHT))
@@ -624,7 +455,7 @@ def main_human():
     # -------------------------------------------------------------------------
     run_pregame = True
     while run_pregame:
-        clock.tick(FPS)  # Allow only for FPS Frames per Second
+        clock.tick(HUMAN_FPS)  # Allow only for HUMAN_FPS Frames per Second
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
@@ -658,7 +489,7 @@ def main_human():
     # -------------------------------------------------------------------------
     run = True
     while run:
-        clock.tick(FPS)
+        clock.tick(HUMAN_FPS)
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 # Before Quitting, Save New HighScore [If New Highscore]
@@ -682,26 +513,19 @@ def main_human():
 
         snake.move()
 
-        if snake.wall_collision() or snake.snake_collision():
+        # Game over when dead or the board is full
+        if snake.wall_collision() or snake.snake_collision() or not food.placed:
             if(score > hs_genopt_popopt_backgrid[0]):
                 hs_genopt_popopt_backgrid[0] = score
                 with open(os.path.join("utils", "hs_genopt_popopt_backgrid.txt"), "wb") as fp:            # Save Pickle
                     pickle.dump(hs_genopt_popopt_backgrid, fp)
             main_human() # Go "back" to pregame
 
-        if block_count == 1:
-            block_count += 1
-
-        if block_count == 2:
-            snake.add_block(xsaved, ysaved)
-            block_count = 0
-        
         if food.eaten(snake):
             score += 1
 
             # Create Extra Block Snake
-            (xsaved, ysaved) = snake.get_last_block()
-            block_count += 1
+            snake.grow()
 
             food.new(snake)
         
@@ -720,41 +544,20 @@ def draw_window_ai(win, snake, food, scores, gen, ge, config):
     global block_enlargement
     global neural_net_image
 
-    win.fill((0,0,0))
+    dirty = None
 
     if not block_enlargement:
+        # Only What Changed Since the Last Frame Is Drawn, or Every Board in
+        # One Blit (See utils/render.py)
+        renderer = grid_renderer()
 
-        tmp_stat_font = None
-        try:
-            tmp_stat_font = pygame.font.SysFont("comicsans", int(50 / snake[0].get_ratio()))
-        except Exception as e:
-            # No more snakes
-            pass
-        
-
+        # Board under the mouse is shaded, a click enlarges it
+        hovered = None
+        mos_x, mos_y = pygame.mouse.get_pos()
         for i in range(len(snake)):
-
-            snake[i].draw(win)
-
-            food[i].draw(win)
-
-            # block
             (we, he, wb, hb) = snake[i].get_w_h()
-            
-            # Draw score for each block
-            score = scores[i]
-            text = tmp_stat_font.render(str(score), 1, (255, 255, 255))
-            # Fix here
-            win.blit(text, (we - int(10 / snake[i].get_ratio()) - text.get_width(), hb + int(10 / snake[i].get_ratio())))
-
-            # Transparent rect over bloc if mouse hovers
-            mos_x, mos_y = pygame.mouse.get_pos()
             if(mos_x > wb and mos_x < we and mos_y > hb and mos_y < he):
-                # Draw Transparency Over Block
-                transparency_size = (we-wb, he-hb)
-                transparency = pygame.Surface(transparency_size)
-                transparency.set_alpha(150)
-                win.blit(transparency, (wb, hb))
+                hovered = i
 
                 # If mouse was pressed in the box we defined above
                 if pygame.mouse.get_pressed()[0] == 1:
@@ -762,35 +565,31 @@ def draw_window_ai(win, snake, food, scores, gen, ge, config):
                    # Next frame go to enlarged block
                    block_enlargement = True
 
-        # blocks seperators
-        for i in range(1, int(math.sqrt(blocks))):
-            pygame.draw.line(
-                                win, 
-                                (255,255,255), 
-                                (i * (GAME_WIN_WIDTH / math.sqrt(blocks)), 0), 
-                                (i * (GAME_WIN_WIDTH / math.sqrt(blocks)), GAME_WIN_HEIGHT)
-                            )
-            pygame.draw.line(
-                                win, 
-                                (255,255,255), 
-                                (0, i * (GAME_WIN_HEIGHT / math.sqrt(blocks))), 
-                                (GAME_WIN_WIDTH, i * (GAME_WIN_HEIGHT / math.sqrt(blocks)))
-                            )
-
-
-        # Draw Total Score
-        text = STAT_FONT.render("Score: " + str(sum_list(scores)), 1, (255, 255, 255))
-        text1 = STAT_FONT.render("Total", 1, (255, 255, 255))
-        win.blit(text, (WIN_WIDTH - 10 - text.get_width(), 20 + text1.get_height()))
-        win.blit(text1, (WIN_WIDTH - 10 - text.get_width(), 10))
-
-        # Draw Current Generation
-        text = STAT_FONT.render("Gen: " + str(gen), 1, (255, 255, 255))
-        win.blit(text, (WIN_WIDTH - 10 - text.get_width(), GAME_WIN_HEIGHT - 20 - 2 * text.get_height()))
-
-        # Draw Current Number of Snakes Alive
-        text = STAT_FONT.render("Alive: " + str(len(snake)), 1, (255, 255, 255))
-        win.blit(text, (WIN_WIDTH - 10 - text.get_width(), GAME_WIN_HEIGHT - 10 - text.get_height()))
+        dirty = renderer.draw(win, snake, food, scores, hovered)
+
+        # Info Panel, Redrawn When One of Its Numbers Changes
+        panel = (sum_list(scores), gen, len(snake))
+        if dirty is None or panel != renderer.panel:
+            renderer.panel = panel
+            area = pygame.Rect(GAME_WIN_WIDTH + 1, 0, WIN_WIDTH - GAME_WIN_WIDTH - 1, GAME_WIN_HEIGHT)
+            win.blit(renderer.background, area, area)
+
+            # Draw Total Score
+            text = render.text(STAT_FONT, "Score: " + str(panel[0]), (255, 255, 255))
+            text1 = render.text(STAT_FONT, "Total", (255, 255, 255))
+            win.blit(text, (WIN_WIDTH - 10 - text.get_width(), 20 + text1.get_height()))
+            win.blit(text1, (WIN_WIDTH - 10 - text.get_width(), 10))
+
+            # Draw Current Generation
+            text = render.text(STAT_FONT, "Gen: " + str(gen), (255, 255, 255))
+            win.blit(text, (WIN_WIDTH - 10 - text.get_width(), GAME_WIN_HEIGHT - 20 - 2 * text.get_height()))
+
+            # Draw Current Number of Snakes Alive
+            text = render.text(STAT_FONT, "Alive: " + str(len(snake)), (255, 255, 255))
+            win.blit(text, (WIN_WIDTH - 10 - text.get_width(), GAME_WIN_HEIGHT - 10 - text.get_height()))
+
+            if dirty is not None:
+                dirty.append(area)
 
         # PYGAME MENU FAIL
         # # Return To Menu if Menu Button Pressed / Draw menu button
@@ -799,6 +598,11 @@ def draw_window_ai(win, snake, food, scores, gen, ge, config):
 
     # If enlarge block
     else:
+        win.fill((0,0,0))
+
+        # Grid is drawn from scratch when coming back to it
+        grid_renderer().invalidate()
+
         chosen_snake = None
         chosen_food = None
         chosen_score = 0
@@ -838,7 +642,7 @@ def draw_window_ai(win, snake, food, scores, gen, ge, config):
             win.blit(neural_net_image, (GAME_WIN_WIDTH + int((200 - neural_net_image.get_width()) / 2), 100)) # Make sure it's in the middle
 
         # Draw Current Score
-        text = STAT_FONT.render("Score: " + str(chosen_score), 1, (255, 255, 255))
+        text = render.text(STAT_FONT, "Score: " + str(chosen_score), (255, 255, 255))
         win.blit(text, (WIN_WIDTH - 10 - text.get_width(), 10))
 
         # PYGAME MENU FAIL
@@ -851,12 +655,46 @@ def draw_window_ai(win, snake, food, scores, gen, ge, config):
             neural_net_image = None
             block_enlargement = False
 
-    # information seperator
-    pygame.draw.line(win, (255,255,255), (GAME_WIN_WIDTH, 0), (GAME_WIN_WIDTH, GAME_WIN_HEIGHT))
+    # Update the Current Display (Dirty Rectangles Only for the Grid)
+    if dirty is None:
+        # information seperator
+        pygame.draw.line(win, (255,255,255), (GAME_WIN_WIDTH, 0), (GAME_WIN_WIDTH, GAME_WIN_HEIGHT))
 
-    # Update the Current Display
+        pygame.display.update()
+    else:
+        pygame.display.update(dirty)
+
+def grid_renderer():
+    """
+    Renderer of the AI grid, rebuilt when the number of blocks or the kind
+    of renderer changes
+
+    :return: renderer
+    :type: render.GridRenderer
+    """
+
+    global renderer
+
+    kind = render.RENDERERS[renderer_name]
+    if renderer is None or renderer.blocks != blocks or type(renderer) is not kind:
+        renderer = kind((WIN_WIDTH, GAME_WIN_HEIGHT), (GAME_WIN_WIDTH, GAME_WIN_HEIGHT), blocks)
+
+    return renderer
+
+def draw_turbo(win):
+    """
+    Mark the frame left on screen while turbo stops drawing
+
+    :return: None
+    """
+
+    text = render.text(STAT_FONT, "Turbo", (255, 255, 255))
+    win.blit(text, (WIN_WIDTH - 10 - text.get_width(), (GAME_WIN_HEIGHT - text.get_height()) // 2))
     pygame.display.update()
 
+    # Whole window again once turbo is off
+    grid_renderer().invalidate()
+
 def main_ai(genomes, config):
     # Global Variables
     global FPS
@@ -867,6 +705,15 @@ def main_ai(genomes, config):
     global hs_genopt_popopt_backgrid
 
     global neural_net_image
+    global timeout
+    global features
+    global seed
+    global loop_penalty
+    global spectator
+    global turbo
+
+    encoder = observation.ObservationEncoder(features)
+    evaluate.record_seeds(genomes, seed)
 
     blocks = next_square(hs_genopt_popopt_backgrid[2])
     snakes = hs_genopt_popopt_backgrid[2]
@@ -886,57 +733,60 @@ def main_ai(genomes, config):
             height_begin.append(i * (GAME_WIN_HEIGHT / math.sqrt(blocks)))
             height_end.append((i + 1) * (GAME_WIN_HEIGHT / math.sqrt(blocks)))
 
-    # Set Variables
-    snake = []
-    food = []
-    times = []
-    scores = []
-
-    block_count = []
-    xsaved = []
-    ysaved = []
-
-    nets = []
-    ge = []
-    i = 0
-    for _, g in genomes:
-        net = neat.nn.FeedForwardNetwork.create(g, config)
-        nets.append(net)
-
+    # Set Variables (One Table Row per Genome)
+    agents = AgentTable()
+    for i, (_, g) in enumerate(genomes):
         g.fitness = 0
-        ge.append(g)
-
-        snake.append(Snake(
-                        (width_end[i] + width_begin[i]) / 2, 
-                        (height_end[i] + height_begin[i]) / 2, 
-                        width_begin[i], 
-                        width_end[i], 
-                        height_begin[i], 
-                        height_end[i]
-                    ))
-        food.append(Food(
-                        width_begin[i], 
-                        width_end[i], 
-                        height_begin[i], 
-                        height_end[i]
-                    ))
-
-        times.append(time.time())
-        scores.append(0)
-        block_count.append(0)
-        xsaved.append(0)
-        ysaved.append(0)
-
-        i += 1
+
+        snake = Snake(
+            game.BOARD_SIZE // 2,
+            game.BOARD_SIZE // 2,
+            width_begin[i],
+            width_end[i],
+            height_begin[i],
+            height_end[i],
+            math.sqrt(blocks)
+        )
+
+        agents.add(
+            snake,
+            Food(
+                width_begin[i],
+                width_end[i],
+                height_begin[i],
+                height_end[i],
+                math.sqrt(blocks),
+                random.Random(evaluate.episode_seed(g)),
+                snake
+            ),
+            compiled_net.create(g, config),
+            g
+        )
 
     clock = pygame.time.Clock()
-    score = 0
     gen += 1
 
+    tick = 0
+    next_frame = time.perf_counter()
+
     run = True
     while run:
-        clock.tick(FPS)
-        for event in pygame.event.get():
+        tick += 1
+
+        # Spectator / Turbo: Simulate Flat Out, Draw and Read Input Only When a
+        # Frame Is Due (FPS Times per Second or Every x Ticks)
+        if spectator[0] or turbo:
+            if spectator[1] is not None:
+                frame_due = tick % spectator[1] == 0
+            else:
+                frame_due = time.perf_counter() >= next_frame
+                if frame_due:
+                    next_frame = time.perf_counter() + 1 / FPS
+        else:
+            clock.tick(FPS)
+            frame_due = True
+
+        for event in pygame.event.get() if frame_due else []:
             if event.type == pygame.QUIT:
                 if neural_net_image != None:
                     try:
@@ -948,20 +798,25 @@ def main_ai(genomes, config):
                 pygame.quit()
                 quit()
 
-        if not len(snake) > 0:
+            # Turbo Key: Stop / Start Drawing
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_t:
+                turbo = not turbo
+                if turbo:
+                    draw_turbo(win)
+
+        if not len(agents.live) > 0:
             run = False
 
-        for x, python in enumerate(snake):
-            ge[x].fitness += 0.5
+        for x in agents.live:
+            python = agents.snake[x]
+            apple = agents.food[x]
+            g = agents.genome[x]
 
-            (headx, heady) = python.get_coord_head()
-            (food_distance_x, food_distance_y) = food[x].distance_to_food(python)
-            
-            # SubInp: Distance to Snake OR Wall (What's Closest)
-            (right, left, down, up) = python.dis_to_snake_or_wall()
+            g.fitness += 0.5
+            agents.ticks[x] += 1
 
-            # Inputs: Headx, Heady, Distance to Food, Subinp1, Subinp2
-            outputs = net.activate((headx, heady, food_distance_x, food_distance_y, right, left, down, up))
+            # Inputs: Selected Feature Set (See utils/observation.py)
+            outputs = agents.net[x].activate(encoder.encode(python, apple))
             direc = outputs.index(max(outputs))
 
             # Go Right / Left / Up / Down
@@ -976,39 +831,54 @@ def main_ai(genomes, config):
 
             python.move()
 
-            if python.wall_collision() or python.snake_collision() or (time.time() - times[x] >= 10):
-                snake.pop(x)
-                food.pop(x)
-                nets.pop(x)
-                times.pop(x)
-                scores.pop(x)
-                ge[x].fitness -= 2
-                ge.pop(x)
+            starved = agents.ticks[x] >= evaluate.timeout_ticks(python.get_length(), timeout[0], timeout[1])
 
-        for x, apple in enumerate(food):
-            if block_count[x] == 1:
-                block_count[x] += 1
+            if python.wall_collision() or python.snake_collision() or starved:
+                g.fitness -= 2
+                agents.alive[x] = False
+                continue
 
-            if block_count[x] == 2:
-                snake[x].add_block(xsaved[x], ysaved[x])
+            if apple.eaten(python):
+                g.fitness += 30
 
-                block_count[x] = 0
+                agents.ticks[x] = 0
 
-            if apple.eaten(snake[x]):
-                ge[x].fitness += 30
+                agents.score[x] += 1
 
-                times[x] = time.time()
+                python.grow()
+                agents.visited[x].clear()
 
-                scores[x] += 1
+                # Board full, the snake won
+                if not apple.new(python):
+                    agents.alive[x] = False
 
-                (xsaved[x], ysaved[x]) = snake[x].get_last_block()
-                block_count[x] += 1
+            # Back in a state seen since the last food, going in circles
+            elif loop_penalty is not None:
+                state = python.state()
+                if state in agents.visited[x]:
+                    g.fitness -= loop_penalty
+                    agents.alive[x] = False
+                    continue
 
-                apple.new(snake[x])
+                agents.visited[x].add(state)
 
-        draw_window_ai(win, snake, food, scores, gen, ge, config)
+        # Drop the dead once per tick
+        agents.compact()
 
-def run(config_path):
+        if not frame_due or turbo:
+            continue
+
+        draw_window_ai(
+            win,
+            agents.column(agents.snake),
+            agents.column(agents.food),
+            agents.column(agents.score),
+            gen,
+            agents.column(agents.genome),
+            config
+        )
+
+def run(config_path, headless=False, workers=1, backend="objects", resume=None):
     """
     Use given configuration path and variables to start teaching the AI to play the game
     Then visualize the data with the genome containing highest fitness
@@ -1016,12 +886,35 @@ def run(config_path):
     :param config_path: path to the neural 
     :type config_path: int / range[0 -> 99]
 
+    :param headless: evaluate genomes without a display as fast as the CPU allows
+    :type headless: bool
+
+    :param workers: processes evaluating genomes in parallel (headless only)
+    :type workers: int
+
+    :param backend: headless engine, one Snake object per genome ("objects")
+                    or the whole population in NumPy arrays ("batch")
+    :type backend: str
+
+    :param resume: checkpoint file to carry on training from
+    :type resume: str
+
     :return: None
     """
 
     # Global Variables
     global hs_genopt_popopt_backgrid
     global gen
+    global timeout
+    global features
+    global seed
+    global cache_size
+    global episodes
+    global cutoff
+    global loop_penalty
+    global checkpoint_every
+    global checkpoint_prefix
+    global replays
 
     # -------------------------------------------------------------------------
     # Load Configuration
@@ -1034,18 +927,46 @@ def run(config_path):
         config_path
     )
 
-    # Create Population
-    p = neat.Population(config)
+    # Networks Compiled by a Previous Run Belong to Other Genomes of the Same Keys
+    compiled_net.clear()
+
+    # Create Population (or Pick Up Where a Checkpoint Left Off)
+    if resume is None:
+        # Seeded Runs Evolve the Same Way Too (NEAT Draws From random)
+        if seed is not None:
+            random.seed(seed)
+        p = neat.Population(config)
+    else:
+        p = checkpoint.restore(resume)
+
+        # The Checkpoint's Config Fixes the Network Inputs, the Feature Set Must Fit
+        if p.config.genome_config.num_inputs != observation.num_inputs(features):
+            sys.exit("{} was saved with {} network inputs, --features {} gives {}".format(
+                resume, p.config.genome_config.num_inputs, features, observation.num_inputs(features)))
+
+        hs_genopt_popopt_backgrid[2] = p.config.pop_size
+        print("Resuming from {} at generation {}".format(resume, p.generation))
 
     # Add StdOut Reporter (Displays Progress in Terminal)
     p.add_reporter(neat.StdOutReporter(True))
     stats = neat.StatisticsReporter()
     p.add_reporter(stats)
 
-    """ Save Population in Generation x
-    x = 3
-    p.add_reporter(neat.Checkpointer(x))
-    """
+    # Save Population Every x Generations / y Seconds (Written in the Background)
+    checkpointer = None
+    if checkpoint_every[0] is not None or checkpoint_every[1] is not None:
+        checkpointer = checkpoint.AsyncCheckpointer(p, checkpoint_every[0], checkpoint_every[1], checkpoint_prefix)
+        p.add_reporter(checkpointer)
+
+    # Record Every Generation's Champion
+    if replays is not None:
+        p.add_reporter(replay.ReplayReporter(
+            replays,
+            timeout=timeout[0],
+            timeout_per_block=timeout[1],
+            features=features,
+            loop_penalty=loop_penalty
+        ))
 
     # Handle Generation Count of 0
     if hs_genopt_popopt_backgrid[1] < 1:
@@ -1056,11 +977,63 @@ def run(config_path):
     with open(os.path.join("utils", "hs_genopt_popopt_backgrid.txt"), "wb") as fp:            # Save Pickle
         pickle.dump(hs_genopt_popopt_backgrid, fp)
 
-    # Reset Gen Count
-    gen = 0
+    # Reset Gen Count (Generations Already Played When Resuming)
+    gen = p.generation
+
+    # Watch the Snakes Play or Train Headless
+    fitness_function = main_ai
+    pool = None
+    if headless and backend == "batch":
+        fitness_function = functools.partial(
+            batch_env.eval_genomes,
+            timeout=timeout[0],
+            timeout_per_block=timeout[1],
+            features=features,
+            seed=seed,
+            episodes=episodes,
+            cutoff=cutoff,
+            loop_penalty=loop_penalty
+        )
+    elif headless:
+        # Every genome plays its own games, score them in worker processes
+        if workers > 1:
+            pool = multiprocessing.Pool(workers)
+
+        fitness_function = functools.partial(
+            evaluate.eval_genomes,
+            timeout=timeout[0],
+            timeout_per_block=timeout[1],
+            features=features,
+            seed=seed,
+            episodes=episodes,
+            cutoff=cutoff,
+            pool=pool,
+            loop_penalty=loop_penalty
+        )
+
+    # Seeded Games Are Deterministic, Genomes Carried Over Keep Their Fitness
+    cache = None
+    if headless and seed is not None and cache_size > 0:
+        cache = fitness_cache.FitnessCache(
+            fitness_function,
+            seed,
+            (timeout[0], timeout[1], features, backend, episodes, loop_penalty),
+            cache_size
+        )
+        fitness_function = cache
 
     # Run Up to [Gen. Option] Generations
-    winner = p.run(main_ai, hs_genopt_popopt_backgrid[1]) # We Save Best Genome
+    winner = p.run(fitness_function, hs_genopt_popopt_backgrid[1]) # We Save Best Genome
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    if checkpointer is not None:
+        checkpointer.close()
+
+    if cache is not None:
+        print("Fitness cache: {} hits, {} evaluated".format(cache.hits, cache.misses))
 
     # -------------------------------------------------------------------------
     # Visualize Neural Network, Statistics, and Species
@@ -1081,16 +1054,22 @@ def run(config_path):
 
     # """
 
-    """ Load and Run Saved Checkpoint
-    gen = x
-    p = neat.Checkpointer.restore_checkpoint('neat-checkpoint-' + str(x - 1))
-    p.run(main_ai, 2)
-    """
-
-def start_AI():
+def start_AI(headless=False, workers=1, backend="objects", resume=None):
     """
     Prepare the artificial intelligence by resetting and setting values and the configuration
 
+    :param headless: train without a display (see run)
+    :type headless: bool
+
+    :param workers: parallel evaluation processes when headless (see run)
+    :type workers: int
+
+    :param backend: headless simulation engine (see run)
+    :type backend: str
+
+    :param resume: checkpoint file to carry on training from (see run)
+    :type resume: str
+
     :return: None
     """
 
@@ -1102,15 +1081,15 @@ def start_AI():
         print('Population set to 2. P.S: The NN needs at least 2 genomes to function properly.')
         hs_genopt_popopt_backgrid[2] = 2
 
-    # Modify NEAT Configuration File For Population Count
-    confmodif.conf_file_modify(hs_genopt_popopt_backgrid[2])
+    # Modify NEAT Configuration File For Population Count and Network Inputs
+    confmodif.conf_file_modify(hs_genopt_popopt_backgrid[2], observation.num_inputs(features))
 
     # -------------------------------------------------------------------------
     # Set and Run Configuration Path
     # -------------------------------------------------------------------------
     local_dir = os.path.dirname(__file__)
     config_path = os.path.join(local_dir, os.path.join("utils", "config-feedforward.txt"))
-    run(config_path)
+    run(config_path, headless, workers, backend, resume)
 
 def set_val_gen(value):
     """
@@ -1250,7 +1229,95 @@ def menu():
 # -----------------------------------------------------------------------------
 # Main Program
 # -----------------------------------------------------------------------------
+def parse_args():
+    """
+    Read command line options, defaulting to the saved AI Options
+
+    :return: parsed arguments
+    :type: argparse.Namespace
+    """
+
+    # No Abbreviations: HEADLESS Above Matches the Exact --headless Option
+    parser = argparse.ArgumentParser(description="Snake AI", allow_abbrev=False)
+    parser.add_argument("--headless", action="store_true",
+                        help="train without a display, as fast as the CPU allows")
+    parser.add_argument("--generations", type=int, default=hs_genopt_popopt_backgrid[1],
+                        help="number of generations to run")
+    parser.add_argument("--population", type=int, default=hs_genopt_popopt_backgrid[2],
+                        help="number of genomes per generation")
+    parser.add_argument("--timeout", type=int, default=timeout[0],
+                        help="ticks a snake may go without eating")
+    parser.add_argument("--timeout-per-block", type=int, default=timeout[1],
+                        help="extra ticks without eating for every block of body")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes evaluating genomes in parallel when headless, 0 for all cores")
+    parser.add_argument("--backend", choices=["objects", "batch"], default="objects",
+                        help="headless engine: a Snake object per genome or the population in NumPy arrays")
+    parser.add_argument("--features", choices=sorted(observation.FEATURE_SETS), default=features,
+                        help="network inputs, see utils/observation.py")
+    parser.add_argument("--seed", type=int, default=seed,
+                        help="master seed, every genome plays its own reproducible food positions")
+    parser.add_argument("--cache-size", type=int, default=cache_size,
+                        help="fitness results kept for genomes seen before (seeded runs), 0 to disable")
+    parser.add_argument("--episodes", type=int, default=episodes,
+                        help="headless games per genome, fitness is their mean")
+    parser.add_argument("--cutoff", type=float, default=cutoff,
+                        help="percentile of the generation a genome must reach to play its next episode")
+    parser.add_argument("--loop-penalty", type=float, default=loop_penalty,
+                        help="fitness lost by a snake ended early for going in circles")
+    parser.add_argument("--allow-loops", action="store_true",
+                        help="let snakes going in circles play on until they starve")
+    parser.add_argument("--checkpoint-every", type=int, default=checkpoint_every[0],
+                        help="save the population every N generations")
+    parser.add_argument("--checkpoint-seconds", type=float, default=checkpoint_every[1],
+                        help="save the population at most every T seconds")
+    parser.add_argument("--checkpoint-prefix", default=checkpoint_prefix,
+                        help="path and name of the checkpoint files, the generation is appended")
+    parser.add_argument("--spectator", action="store_true",
+                        help="simulate as fast as possible and draw FPS frames per second (T toggles turbo, no drawing)")
+    parser.add_argument("--render-every", type=int, default=spectator[1],
+                        help="in spectator mode draw every N ticks instead of FPS frames per second")
+    parser.add_argument("--renderer", choices=sorted(render.RENDERERS), default=renderer_name,
+                        help="draw the AI grid by repainting what changed (dirty) or every board from one array in one blit (array)")
+    parser.add_argument("--replays", metavar="DIR", default=replays,
+                        help="save a replay of every generation's champion, see utils/replay.py")
+    parser.add_argument("--resume", metavar="CHECKPOINT",
+                        help="carry on training from a checkpoint file")
+
+    args = parser.parse_args()
+
+    if args.cutoff is not None and not 0 <= args.cutoff <= 100:
+        parser.error("--cutoff must be a percentile between 0 and 100")
+
+    if args.render_every is not None and args.render_every < 1:
+        parser.error("--render-every must be at least 1")
+
+    if args.workers != 1 and (not args.headless or args.backend == "batch"):
+        parser.error("--workers only applies to --headless training with the objects backend")
+
+    return args
+
 if __name__== "__main__":
+    args = parse_args()
+    hs_genopt_popopt_backgrid[1] = args.generations
+    hs_genopt_popopt_backgrid[2] = args.population
+    timeout = [args.timeout, args.timeout_per_block]
+    features = args.features
+    seed = args.seed
+    cache_size = args.cache_size
+    episodes = max(1, args.episodes)
+    cutoff = args.cutoff
+    loop_penalty = None if args.allow_loops else args.loop_penalty
+    checkpoint_every = [args.checkpoint_every, args.checkpoint_seconds]
+    checkpoint_prefix = args.checkpoint_prefix
+    replays = args.replays
+    renderer_name = args.renderer
+    spectator = [args.spectator or args.render_every is not None, args.render_every]
+
+    workers = args.workers
+    if workers < 1:
+        workers = os.cpu_count() or 1
+
     # Run Menu
     # menu()
-    start_AI()
+    start_AI(args.headless, workers, args.backend, args.resume)
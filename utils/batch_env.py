@@ -0,0 +1,338 @@
+"""
+Vectorised Snake environment
+
+Holds every snake of a population in NumPy arrays (heads, directions, body
+ring buffers, occupancy grids, food) and advances all live snakes with one
+call per tick. Rules, inputs and rewards follow utils/game.py and
+utils/evaluate.py, and a seeded snake gets the same food as a seeded Food, so
+both engines play the same games.
+
+Benchmark against the object-per-snake path with:
+
+    python -m utils.batch_env
+"""
+
+import time
+import random
+
+import numpy as np
+
+from utils.game import Snake, Food, BOARD_SIZE
+from utils.batch_net import BatchNetwork
+from utils.observation import ObservationEncoder
+from utils.evaluate import TIMEOUT_TICKS, TIMEOUT_TICKS_PER_BLOCK, LOOP_PENALTY, episode_seed, record_seeds, cut_off, record_episodes
+
+# Moves in network output order: Right / Left / Down / Up
+DIRECTIONS = np.array([[1, 0], [-1, 0], [0, 1], [0, -1]])
+UP = 3
+
+# Rewards, matching the fitness of main_ai
+TICK_REWARD = 0.5
+FOOD_REWARD = 30
+DEATH_PENALTY = 2
+
+
+class BatchSnakeEnv:
+    def __init__(self, n, timeout=TIMEOUT_TICKS, timeout_per_block=TIMEOUT_TICKS_PER_BLOCK, seed=None, features='classic', seeds=None, loop_penalty=None):
+        self.n = n
+        self.encoder = ObservationEncoder(features)
+        self.size = BOARD_SIZE
+        self.timeout = timeout
+        self.timeout_per_block = timeout_per_block
+        self.loop_penalty = loop_penalty
+        self.rng = np.random.default_rng(seed)
+
+        # One food stream per snake when given seeds, so a snake's game does
+        # not depend on the others (the same stream as a seeded Food)
+        self.rngs = None
+        if seeds is not None:
+            self.rngs = [random.Random(s) for s in seeds]
+
+        # Ring buffer long enough for a snake covering the whole board
+        self.capacity = BOARD_SIZE * BOARD_SIZE + 1
+
+        # Body ring buffer of (x, y) cells, head at head_index, tail length - 1 behind
+        self.body = np.zeros((n, self.capacity, 2), dtype=np.int64)
+        self.head_index = np.zeros(n, dtype=np.int64)
+        self.length = np.zeros(n, dtype=np.int64)
+        self.growth = np.zeros(n, dtype=np.int64)
+        self.direction = np.zeros(n, dtype=np.int64)
+
+        # Occupancy grids indexed [snake, y, x]
+        self.occupied = np.zeros((n, self.size, self.size), dtype=bool)
+
+        # Head cells and directions seen since the last food, indexed
+        # [snake, direction, y, x] (the length only changes after eating)
+        self.visited = np.zeros((n, 4, self.size, self.size), dtype=bool)
+
+        self.food = np.zeros((n, 2), dtype=np.int64)
+        self.alive = np.zeros(n, dtype=bool)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.scores = np.zeros(n, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, idx=None):
+        """
+        Start a new game for the given snakes (all by default)
+
+        :param idx: snakes to restart
+        :type idx: np.ndarray
+
+        :return: observations of every snake
+        :type: np.ndarray (n, encoder.size)
+        """
+
+        if idx is None:
+            idx = np.arange(self.n)
+        centre = self.size // 2
+
+        # Starting with 3 blocks, head in the centre facing up
+        self.body[idx, 0] = (centre, centre + 2)
+        self.body[idx, 1] = (centre, centre + 1)
+        self.body[idx, 2] = (centre, centre)
+        self.head_index[idx] = 2
+        self.length[idx] = 3
+        self.growth[idx] = 0
+        self.direction[idx] = UP
+
+        self.occupied[idx] = False
+        self.occupied[idx, centre:centre + 3, centre] = True
+        self.visited[idx] = False
+        self.place_food(idx)
+
+        self.alive[idx] = True
+        self.ticks[idx] = 0
+        self.scores[idx] = 0
+
+        return self.observations()
+
+    def heads(self):
+        return self.body[np.arange(self.n), self.head_index]
+
+    def place_food(self, idx):
+        """
+        Move the food of the given snakes to a random free cell
+
+        :param idx: snakes needing new food
+        :type idx: np.ndarray
+
+        :return: False where the board is full, the snake won
+        :type: np.ndarray
+        """
+
+        # Free cells in (x, y) order, as Food.new picks them
+        free = ~self.occupied[idx].transpose(0, 2, 1).reshape(len(idx), self.size * self.size)
+
+        if self.rngs is None:
+            # Random key per cell, the largest free one wins
+            keys = self.rng.random(free.shape)
+            keys[~free] = -1
+            cell = keys.argmax(axis=1)
+        else:
+            # Same draw as Food.new from the snake's own seed
+            cell = np.zeros(len(idx), dtype=np.int64)
+            for row, i in enumerate(idx):
+                cells = np.flatnonzero(free[row])
+                if len(cells):
+                    cell[row] = cells[self.rngs[i].randrange(len(cells))]
+
+        self.food[idx, 0] = cell // self.size
+        self.food[idx, 1] = cell % self.size
+
+        return free.any(axis=1)
+
+    def observations(self):
+        """
+        Network inputs of every snake (dead snakes included, ignore them)
+
+        :return: observations
+        :type: np.ndarray (n, encoder.size)
+        """
+
+        return self.encoder.encode_batch(self)
+
+    def step(self, actions):
+        """
+        Advance every live snake by one tick
+
+        :param actions: direction index per snake (Right / Left / Down / Up)
+        :type actions: np.ndarray (n,)
+
+        :return: observations, rewards of this tick and finished snakes
+        :type: (np.ndarray (n, encoder.size), np.ndarray (n,), np.ndarray (n,))
+        """
+
+        reward = np.zeros(self.n)
+        live = np.flatnonzero(self.alive)
+
+        reward[live] += TICK_REWARD
+        self.ticks[live] += 1
+        self.direction[live] = np.asarray(actions)[live]
+
+        new = self.body[live, self.head_index[live]] + DIRECTIONS[self.direction[live]]
+        x = new[:, 0]
+        y = new[:, 1]
+
+        # Tail leaves its cell unless the snake is growing
+        growing = self.growth[live] > 0
+        self.growth[live[growing]] -= 1
+
+        pop = live[~growing]
+        tail = self.body[pop, (self.head_index[pop] - self.length[pop] + 1) % self.capacity]
+        self.occupied[pop, tail[:, 1], tail[:, 0]] = False
+        self.length[pop] -= 1
+
+        # Head enters its cell
+        wall = (x < 0) | (x >= self.size) | (y < 0) | (y >= self.size)
+        bite = ~wall & self.occupied[live, np.clip(y, 0, self.size - 1), np.clip(x, 0, self.size - 1)]
+        limit = self.timeout + self.timeout_per_block * (self.length[live] + 1)
+        dead = wall | bite | (self.ticks[live] >= limit)
+
+        reward[live[dead]] -= DEATH_PENALTY
+        self.alive[live[dead]] = False
+
+        moved = live[~dead]
+        x = x[~dead]
+        y = y[~dead]
+        self.head_index[moved] = (self.head_index[moved] + 1) % self.capacity
+        self.body[moved, self.head_index[moved], 0] = x
+        self.body[moved, self.head_index[moved], 1] = y
+        self.length[moved] += 1
+        self.occupied[moved, y, x] = True
+
+        # Food
+        eaten = (x == self.food[moved, 0]) & (y == self.food[moved, 1])
+        fed = moved[eaten]
+
+        reward[fed] += FOOD_REWARD
+        self.ticks[fed] = 0
+        self.scores[fed] += 1
+        self.growth[fed] += 1
+
+        self.visited[fed] = False
+
+        # Board full, the snake won
+        placed = self.place_food(fed)
+        self.alive[fed[~placed]] = False
+
+        # Back in a state seen since the last food, going in circles
+        if self.loop_penalty is not None:
+            still = moved[~eaten]
+            heading = self.direction[still]
+            (x, y) = (x[~eaten], y[~eaten])
+
+            looped = self.visited[still, heading, y, x]
+            reward[still[looped]] -= self.loop_penalty
+            self.alive[still[looped]] = False
+            self.visited[still, heading, y, x] = True
+
+        return (self.observations(), reward, ~self.alive)
+
+
+def eval_genomes(genomes, config, timeout=TIMEOUT_TICKS, timeout_per_block=TIMEOUT_TICKS_PER_BLOCK, features='classic', seed=None, episodes=1, cutoff=None, loop_penalty=LOOP_PENALTY, known=()):
+    """
+    Fitness function for neat.Population.run, playing every genome's game in
+    one BatchSnakeEnv and activating every network with one BatchNetwork
+    (bind the settings with functools.partial)
+
+    Episodes, cut-off (known fitness included) and loop penalty work as in
+    utils.evaluate.eval_genomes:
+    one BatchSnakeEnv per round holding the genomes still playing.
+
+    :return: None
+    """
+
+    genomes = list(genomes)
+    nets = BatchNetwork([g for _, g in genomes], config)
+    record_seeds(genomes, seed)
+
+    total = np.zeros(len(genomes))
+    played = np.zeros(len(genomes), dtype=np.int64)
+    fitness = np.zeros(len(genomes))
+
+    remaining = list(range(len(genomes)))
+    for episode in range(episodes):
+        rows = np.array(remaining, dtype=np.int64)
+
+        seeds = [episode_seed(genomes[i][1], episode) for i in rows]
+
+        env = BatchSnakeEnv(len(rows), timeout, timeout_per_block, features=features, seeds=seeds, loop_penalty=loop_penalty)
+        observations = env.observations()
+        actions = np.zeros(len(rows), dtype=np.int64)
+        reward = np.zeros(len(rows))
+
+        while env.alive.any():
+            # All live networks in one go
+            live = np.flatnonzero(env.alive)
+            actions[live] = nets.activate(observations[live], rows[live]).argmax(axis=1)
+
+            (observations, tick_reward, _) = env.step(actions)
+            reward += tick_reward
+
+        total[rows] += reward
+        played[rows] += 1
+        fitness[rows] = total[rows] / played[rows]
+
+        remaining = cut_off(fitness, remaining, cutoff, known)
+
+    for (_, g), f in zip(genomes, fitness):
+        g.fitness = float(f)
+    record_episodes(genomes, played, episodes)
+
+
+def benchmark(n=99, ticks=300, seed=0):
+    """
+    Time random play of n snakes in both engines
+
+    :return: seconds taken by the object-per-snake path and the batch path
+    :type: (float, float)
+    """
+
+    rnd = random.Random(seed)
+    moves = ["move_right", "move_left", "move_down", "move_up"]
+
+    # Object per snake (as main_ai steps them)
+    snakes = [Snake(BOARD_SIZE // 2, BOARD_SIZE // 2, 0, 600, 0, 600) for _ in range(n)]
+    foods = [Food(0, 600, 0, 600, snake=snake) for snake in snakes]
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for i in range(n):
+            snake = snakes[i]
+            food = foods[i]
+
+            snake.get_coord_head()
+            food.distance_to_food(snake)
+            snake.dis_to_snake_or_wall()
+
+            getattr(snake, rnd.choice(moves))()
+            snake.move()
+
+            # Restart dead snakes so every tick steps n of them
+            if snake.wall_collision() or snake.snake_collision():
+                snakes[i] = Snake(BOARD_SIZE // 2, BOARD_SIZE // 2, 0, 600, 0, 600)
+                continue
+
+            if food.eaten(snake):
+                snake.grow()
+                food.new(snake)
+    objects = time.perf_counter() - start
+
+    # Batch
+    env = BatchSnakeEnv(n, seed=seed)
+    rng = np.random.default_rng(seed)
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        (_, _, done) = env.step(rng.integers(0, 4, n))
+        env.reset(np.flatnonzero(done))
+    batch = time.perf_counter() - start
+
+    return (objects, batch)
+
+
+if __name__ == "__main__":
+    for n in (16, 99, 1000):
+        (objects, batch) = benchmark(n)
+        print("{:5d} snakes: objects {:.3f}s  batch {:.3f}s  ({:.1f}x)".format(n, objects, batch, objects / batch))
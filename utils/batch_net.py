@@ -0,0 +1,157 @@
+"""
+Batched feed-forward networks
+
+Converts the feed-forward graph of every genome in a population into layered
+NumPy weight matrices so all live snakes can be activated with a handful of
+array operations per tick instead of one neat.nn.FeedForwardNetwork.activate
+call (and a Python loop over every node) per snake.
+"""
+
+import neat
+import numpy as np
+
+
+def _clip(z, low, high):
+    return np.minimum(high, np.maximum(low, z))
+
+
+def _inv(z):
+    with np.errstate(divide="ignore", over="ignore"):
+        return np.where(z == 0, 0.0, 1.0 / np.where(z == 0, 1.0, z))
+
+
+# NumPy versions of neat.activations, same clipping
+ACTIVATIONS = {
+    'sigmoid': lambda z: 1.0 / (1.0 + np.exp(-_clip(5.0 * z, -60.0, 60.0))),
+    'tanh': lambda z: np.tanh(_clip(2.5 * z, -60.0, 60.0)),
+    'sin': lambda z: np.sin(_clip(5.0 * z, -60.0, 60.0)),
+    'gauss': lambda z: np.exp(-5.0 * _clip(z, -3.4, 3.4) ** 2),
+    'relu': lambda z: np.where(z > 0.0, z, 0.0),
+    'softplus': lambda z: 0.2 * np.log(1 + np.exp(_clip(5.0 * z, -60.0, 60.0))),
+    'identity': lambda z: z,
+    'clamped': lambda z: _clip(z, -1.0, 1.0),
+    'inv': _inv,
+    'log': lambda z: np.log(np.maximum(1e-7, z)),
+    'exp': lambda z: np.exp(_clip(z, -60.0, 60.0)),
+    'abs': np.abs,
+    'hat': lambda z: np.maximum(0.0, 1 - np.abs(z)),
+    'square': lambda z: z ** 2,
+    'cube': lambda z: z ** 3,
+}
+
+
+class BatchNetwork:
+    """
+    Every genome gets a row and the same slot layout: inputs first, then the
+    outputs, then its hidden nodes. Layer l holds a (genomes, slots, slots)
+    weight matrix for the nodes evaluated at that depth.
+    """
+
+    def __init__(self, genomes, config):
+        genome_config = config.genome_config
+        self.num_inputs = len(genome_config.input_keys)
+        self.num_outputs = len(genome_config.output_keys)
+
+        nets = [neat.nn.FeedForwardNetwork.create(g, config) for g in genomes]
+        first_hidden = self.num_inputs + self.num_outputs
+
+        # Slot of every node per genome and the depth it is evaluated at
+        slots = []
+        depths = []
+        for net in nets:
+            slot = {}
+            for n, key in enumerate(genome_config.input_keys):
+                slot[key] = n
+            for n, key in enumerate(genome_config.output_keys):
+                slot[key] = self.num_inputs + n
+
+            depth = {}
+            for node, _, _, _, _, links in net.node_evals:
+                if node not in slot:
+                    slot[node] = len(slot)
+                depth[node] = 1 + max([depth.get(i, 0) for i, _ in links], default=0)
+
+            slots.append(slot)
+            depths.append(depth)
+
+        self.size = max([first_hidden] + [len(slot) for slot in slots])
+        self.depth = max([0] + [max(depth.values(), default=0) for depth in depths])
+
+        shape = (self.depth, len(nets), self.size)
+        self.weights = np.zeros((self.depth, len(nets), self.size, self.size))
+        self.bias = np.zeros(shape)
+        self.response = np.zeros(shape)
+        self.layer_mask = np.zeros(shape, dtype=bool)
+        self.activation_masks = {}
+
+        # Genomes with other aggregations than sum are activated one by one
+        self.fallback = {}
+
+        for row, (genome, net) in enumerate(zip(genomes, nets)):
+            slot = slots[row]
+            for node, _, _, bias, response, links in net.node_evals:
+                gene = genome.nodes[node]
+                if gene.aggregation != 'sum':
+                    self.fallback[row] = net
+
+                layer = depths[row][node] - 1
+                target = slot[node]
+
+                self.bias[layer, row, target] = bias
+                self.response[layer, row, target] = response
+                self.layer_mask[layer, row, target] = True
+                for i, w in links:
+                    self.weights[layer, row, target, slot[i]] += w
+
+                if gene.activation not in self.activation_masks:
+                    self.activation_masks[gene.activation] = np.zeros(shape, dtype=bool)
+                self.activation_masks[gene.activation][layer, row, target] = True
+
+        # Functions the config knows but we have no NumPy version of
+        self.activation_functions = {}
+        for name in self.activation_masks:
+            f = ACTIVATIONS.get(name)
+            if f is None:
+                f = np.vectorize(genome_config.activation_defs.get(name), otypes=[float])
+            self.activation_functions[name] = f
+
+    def activate(self, inputs, rows=None):
+        """
+        Activate the networks of the given rows (every genome by default)
+
+        :param inputs: one row of network inputs per activated genome
+        :type inputs: np.ndarray (rows, num_inputs)
+
+        :param rows: genomes to activate, in the order of inputs
+        :type rows: np.ndarray
+
+        :return: outputs of every activated genome
+        :type: np.ndarray (rows, num_outputs)
+        """
+
+        if rows is None:
+            rows = np.arange(self.weights.shape[1])
+
+        values = np.zeros((len(rows), self.size))
+        values[:, :self.num_inputs] = inputs
+
+        for layer in range(self.depth):
+            mask = self.layer_mask[layer, rows]
+            s = np.einsum('gij,gj->gi', self.weights[layer, rows], values)
+            z = self.bias[layer, rows] + self.response[layer, rows] * s
+
+            for name, f in self.activation_functions.items():
+                selected = self.activation_masks[name][layer, rows]
+                if selected.any():
+                    z[selected] = f(z[selected])
+
+            values[mask] = z[mask]
+
+        outputs = values[:, self.num_inputs:self.num_inputs + self.num_outputs]
+
+        if self.fallback:
+            for n, row in enumerate(rows):
+                if row in self.fallback:
+                    outputs[n] = self.fallback[row].activate(inputs[n])
+
+        return outputs
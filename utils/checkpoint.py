@@ -0,0 +1,243 @@
+"""
+Training checkpoints
+
+neat.Checkpointer with the gaps that keep a resumed run from carrying on where
+the interrupted one stopped filled in:
+
+    - files are written to a temporary file, flushed to disk and renamed over
+      the target, so a crash mid-write never leaves a truncated checkpoint
+    - the genome key counter of the reproduction is saved, a restored
+      population would otherwise hand out keys already in use (keys pick the
+      compiled network and the food seed of a genome)
+    - the generation saved is the one the population is about to play
+    - reporters are left out, the restored species set reports to the new
+      population's
+
+Files stay gzip compressed pickles of the same layout (plus the counter), so
+they can be inspected like any neat checkpoint. AsyncCheckpointer moves the
+compression and writing off the generation loop.
+"""
+
+import os
+import gzip
+import time
+import queue
+import atexit
+import pickle
+import random
+import tempfile
+import itertools
+import threading
+
+import neat
+
+# Default name of the checkpoint files, the generation number is appended
+FILENAME_PREFIX = "neat-checkpoint-"
+
+# umask of the process, read once at import (reading it means setting it,
+# which the writer thread must not race with)
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def peek_counter(owner, name):
+    """
+    Next value of an itertools.count attribute, without consuming it
+
+    :return: next value
+    :type: int
+    """
+
+    value = next(getattr(owner, name))
+    setattr(owner, name, itertools.count(value))
+
+    return value
+
+
+class Checkpointer(neat.Checkpointer):
+    def __init__(self, population, generation_interval=None, time_interval_seconds=None, filename_prefix=FILENAME_PREFIX):
+        """
+        Reporter saving the population every generation_interval generations
+        or time_interval_seconds seconds, whichever comes first
+
+        :param population: population the reporter is added to
+        :type population: neat.Population
+        """
+
+        super().__init__(generation_interval, time_interval_seconds, filename_prefix)
+        self.population = population
+
+        # Seconds the generation loop spent checkpointing
+        self.seconds = 0.0
+        self.saved = 0
+
+    def save_checkpoint(self, config, population, species_set, generation):
+        # Called at the end of a generation with the next one's population
+        start = time.perf_counter()
+
+        generation += 1
+        filename = "{}{}".format(self.filename_prefix, generation)
+        print("Saving checkpoint to {}".format(filename))
+
+        # Reporters (this one included) are not part of the state, restore
+        # hands the species set the new population's
+        reporters = species_set.reporters
+        species_set.reporters = None
+        try:
+            payload = snapshot((
+                generation,
+                config,
+                population,
+                species_set,
+                random.getstate(),
+                peek_counter(self.population.reproduction, 'genome_indexer')
+            ))
+        finally:
+            species_set.reporters = reporters
+
+        self.write(filename, payload)
+
+        self.seconds += time.perf_counter() - start
+        self.saved += 1
+
+    def write(self, filename, payload):
+        write_atomic(filename, payload)
+
+    def close(self):
+        if self.saved:
+            print("Checkpoints: {} saved, {:.3f} sec in the generation loop".format(self.saved, self.seconds))
+
+    @staticmethod
+    def restore_checkpoint(filename):
+        return restore(filename)
+
+
+class AsyncCheckpointer(Checkpointer):
+    """
+    Checkpointer only taking a snapshot (the pickle) in the generation loop,
+    compression and writing happen on a background thread. A full queue
+    blocks the next snapshot until a write is done; close() waits for every
+    queued checkpoint (also called at exit).
+    """
+
+    def __init__(self, population, generation_interval=None, time_interval_seconds=None, filename_prefix=FILENAME_PREFIX, queue_size=2):
+        super().__init__(population, generation_interval, time_interval_seconds, filename_prefix)
+
+        # Seconds the background thread spent compressing and writing
+        self.write_seconds = 0.0
+        self.error = None
+
+        self.queue = queue.Queue(queue_size)
+        self.thread = threading.Thread(target=self.writer, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def write(self, filename, payload):
+        self.raise_error()
+        self.queue.put((filename, payload))
+
+    def writer(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            start = time.perf_counter()
+            try:
+                write_atomic(*item)
+            except Exception as e:
+                self.error = e
+            self.write_seconds += time.perf_counter() - start
+
+    def raise_error(self):
+        # Failed writes surface on the generation loop's side
+        (error, self.error) = (self.error, None)
+        if error is not None:
+            raise error
+
+    def close(self):
+        if not self.thread.is_alive():
+            return
+
+        self.queue.put(None)
+        self.thread.join()
+        atexit.unregister(self.close)
+
+        if self.saved:
+            print("Checkpoints: {} saved, {:.3f} sec in the generation loop, {:.3f} sec writing in the background".format(
+                self.saved, self.seconds, self.write_seconds))
+        self.raise_error()
+
+
+def snapshot(data):
+    """
+    Pickle of data, taken before the next generation changes it
+
+    :return: pickled data
+    :type: bytes
+    """
+
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def write_atomic(filename, payload):
+    """
+    Compress a snapshot into filename, all or nothing: written to a temporary
+    file, flushed to disk and renamed over the target
+
+    :return: None
+    """
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+
+    (fd, temporary) = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+    try:
+        # mkstemp makes the file private, give it the mode open() would
+        if hasattr(os, "fchmod"):
+            os.fchmod(fd, 0o666 & ~UMASK)
+
+        with os.fdopen(fd, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=5) as f:
+                f.write(payload)
+            raw.flush()
+            os.fsync(raw.fileno())
+
+        os.replace(temporary, filename)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+    # Make the rename itself durable (directories can't be opened on Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def restore(filename):
+    """
+    Population saved in a checkpoint, with the random state and genome key
+    counter it was saved with (reads plain neat checkpoints too)
+
+    :return: population ready to run, generation set to the one to play next
+    :type: neat.Population
+    """
+
+    with gzip.open(filename) as f:
+        data = pickle.load(f)
+
+    (generation, config, population, species_set, random_state) = data[:5]
+
+    random.setstate(random_state)
+    p = neat.Population(config, (population, species_set, generation))
+    p.species.reporters = p.reporters
+
+    if len(data) > 5:
+        p.reproduction.genome_indexer = itertools.count(data[5])
+    else:
+        p.reproduction.genome_indexer = itertools.count(max(population) + 1)
+
+    return p
@@ -0,0 +1,129 @@
+"""
+Genomes compiled to straight-line Python
+
+Generates one Python function per genome from the node evaluations of
+neat.nn.FeedForwardNetwork.create: every node becomes one line with its
+weights, bias and response inlined and its activation resolved, so a decision
+costs a handful of float operations instead of neat's dictionary and list
+juggling. Compiled networks are cached per genome key (NEAT never changes the
+genes of an existing key, mutations create new genomes). Keys start over with
+every new population, clear() the cache before running one.
+"""
+
+import math
+
+import neat
+
+# Activations written out inline, anything else calls the config's function
+INLINE_ACTIVATIONS = {
+    'sigmoid': "1.0 / (1.0 + exp(-max(-60.0, min(60.0, 5.0 * ({0})))))",
+    'tanh': "tanh(max(-60.0, min(60.0, 2.5 * ({0}))))",
+    'softplus': "0.2 * log(1 + exp(max(-60.0, min(60.0, 5.0 * ({0})))))",
+    'relu': "max(0.0, {0})",
+    'identity': "({0})",
+    'clamped': "max(-1.0, min(1.0, {0}))",
+    'abs': "abs({0})",
+    'square': "({0}) ** 2",
+    'cube': "({0}) ** 3",
+}
+
+# Compiled networks by genome key, oldest dropped past CACHE_SIZE
+CACHE_SIZE = 1000
+cache = {}
+
+
+class CompiledNetwork:
+    """
+    Drop-in for neat.nn.FeedForwardNetwork: activate(inputs) returns the list
+    of outputs
+    """
+
+    def __init__(self, genome, config):
+        self.source = compile_source(genome, config)
+
+        namespace = {
+            'exp': math.exp,
+            'log': math.log,
+            'tanh': math.tanh,
+        }
+        for name, f in config.genome_config.activation_defs.functions.items():
+            namespace['activation_' + name] = f
+        for name, f in config.genome_config.aggregation_function_defs.functions.items():
+            namespace['aggregation_' + name] = f
+
+        exec(self.source, namespace)
+        self.activate = namespace['activate']
+
+
+def compile_source(genome, config):
+    """
+    Python source of the activate function of the given genome
+
+    :return: source defining activate(inputs)
+    :type: str
+    """
+
+    genome_config = config.genome_config
+    net = neat.nn.FeedForwardNetwork.create(genome, config)
+
+    def var(key):
+        return "v{}".format(key).replace("-", "_")
+
+    lines = ["def activate(inputs):"]
+    lines.append("    {}, = inputs".format(", ".join(var(k) for k in genome_config.input_keys)))
+
+    # Outputs no connection reaches stay 0.0 as in neat
+    evaluated = set(node for node, _, _, _, _, _ in net.node_evals)
+    for key in genome_config.output_keys:
+        if key not in evaluated:
+            lines.append("    {} = 0.0".format(var(key)))
+
+    for node, _, _, bias, response, links in net.node_evals:
+        gene = genome.nodes[node]
+
+        terms = ["{} * {!r}".format(var(i), w) for i, w in links]
+        if gene.aggregation == 'sum':
+            s = " + ".join(terms) or "0.0"
+        else:
+            s = "aggregation_{}([{}])".format(gene.aggregation, ", ".join(terms))
+
+        z = "{!r} + {!r} * ({})".format(bias, response, s)
+        if gene.activation in INLINE_ACTIVATIONS:
+            expression = INLINE_ACTIVATIONS[gene.activation].format(z)
+        else:
+            expression = "activation_{}({})".format(gene.activation, z)
+
+        lines.append("    {} = {}".format(var(node), expression))
+
+    lines.append("    return [{}]".format(", ".join(var(k) for k in genome_config.output_keys)))
+
+    return "\n".join(lines) + "\n"
+
+
+def create(genome, config):
+    """
+    Compiled network of the genome, built once per genome key
+
+    :return: network with an activate(inputs) method
+    :type: CompiledNetwork
+    """
+
+    net = cache.get(genome.key)
+    if net is None:
+        net = CompiledNetwork(genome, config)
+
+        if len(cache) >= CACHE_SIZE:
+            del cache[next(iter(cache))]
+        cache[genome.key] = net
+
+    return net
+
+
+def clear():
+    """
+    Forget every compiled network (a new population reuses the genome keys)
+
+    :return: None
+    """
+
+    cache.clear()
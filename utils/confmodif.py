@@ -1,6 +1,6 @@
 import os
 
-def conf_file_modify(pop):
+def conf_file_modify(pop, inputs=8):
     config_file = open(os.path.join("utils", "config-feedforward.txt"), "w")
 
     config_file.write("[NEAT]\n")
@@ -50,7 +50,7 @@ def conf_file_modify(pop):
 
     config_file.write("# network parameters\n")
     config_file.write("num_hidden              = 0\n")
-    config_file.write("num_inputs              = 8\n")
+    config_file.write("num_inputs              = " + str(inputs) + "\n")
     config_file.write("num_outputs             = 4\n\n")
 
     config_file.write("# node response options\n")
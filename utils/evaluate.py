@@ -0,0 +1,331 @@
+"""
+Headless genome evaluation
+
+Plays the same game as main_ai in snake.py, one snake per genome on the whole
+board, but without a display, event pump, font or clock so a generation only
+takes as long as the CPU needs to step the simulation.
+
+Every genome plays with its own food stream, seeded by genome.episode_seed
+(see record_seeds): derived from the master seed and its genome key when
+given, so its fitness does not depend on the order genomes are played in, the
+other genomes or the worker running it, and drawn at random otherwise. Either
+way the games a genome was scored on can be played again.
+"""
+
+import random
+import hashlib
+
+import numpy as np
+
+from utils import compiled_net
+from utils.game import Snake, Food, BOARD_SIZE
+from utils.observation import ObservationEncoder
+
+# Game area (same as snake.py, only used for drawing)
+GAME_WIN_WIDTH = 600
+GAME_WIN_HEIGHT = 600
+
+# Ticks without food before a snake is killed (10 seconds at 30 FPS)
+TIMEOUT_TICKS = 300
+# Extra ticks allowed for every block of body, long snakes need detours
+TIMEOUT_TICKS_PER_BLOCK = 2
+
+# Episode seeds of runs without a master seed, apart from the random state
+# NEAT evolves with
+SEEDS = random.Random()
+
+# Fitness lost by a snake back in a state it was in since its last food
+# (same head, direction and length), it is going in circles
+LOOP_PENALTY = 2
+
+
+def timeout_ticks(length, timeout=TIMEOUT_TICKS, timeout_per_block=TIMEOUT_TICKS_PER_BLOCK):
+    """
+    Number of ticks a snake of the given length may go without eating
+
+    :param length: number of blocks in the snake body
+    :type length: int
+
+    :return: starvation limit in simulation ticks
+    :type: int
+    """
+
+    return timeout + timeout_per_block * length
+
+
+def genome_seed(seed, genome_key, episode=0):
+    """
+    Seed of one episode of one genome, derived from the master seed (stable
+    across processes and runs, unlike hash())
+
+    :param seed: master seed of the run
+    :type seed: int
+
+    :param genome_key: key of the genome playing
+    :type genome_key: int
+
+    :param episode: index of the episode played by the genome
+    :type episode: int
+
+    :return: episode seed
+    :type: int
+    """
+
+    digest = hashlib.sha256("{}:{}:{}".format(seed, genome_key, episode).encode()).digest()
+
+    return int.from_bytes(digest[:8], "big")
+
+
+def record_seeds(genomes, seed):
+    """
+    Store the seed of the first episode every genome plays as
+    genome.episode_seed, derived from the master seed or drawn from SEEDS
+    without one, so its games can be played again
+
+    :return: None
+    """
+
+    for _, genome in genomes:
+        if seed is None:
+            genome.episode_seed = SEEDS.getrandbits(64)
+        else:
+            genome.episode_seed = genome_seed(seed, genome.key)
+
+
+def episode_seed(genome, episode=0):
+    """
+    Seed of one episode of a genome, from the genome.episode_seed given by
+    record_seeds
+
+    :return: episode seed
+    :type: int
+    """
+
+    if episode == 0:
+        return genome.episode_seed
+
+    return genome_seed(genome.episode_seed, genome.key, episode)
+
+
+def play_episode(net, timeout=TIMEOUT_TICKS, timeout_per_block=TIMEOUT_TICKS_PER_BLOCK, features='classic', seed=None, loop_penalty=LOOP_PENALTY, recorder=None):
+    """
+    Play one game of snake driven by the given network
+
+    :param net: network deciding the direction every tick
+    :type net: compiled_net.CompiledNetwork / neat.nn.FeedForwardNetwork
+
+    :param timeout: ticks without food before the snake starves
+    :type timeout: int
+
+    :param timeout_per_block: extra ticks without food per body block
+    :type timeout_per_block: int
+
+    :param features: feature set of the network inputs (see utils/observation.py)
+    :type features: str
+
+    :param seed: seed of the food positions, None for the global random state
+    :type seed: int
+
+    :param loop_penalty: fitness lost when the game is ended for going in
+                         circles, None lets snakes loop until they starve
+    :type loop_penalty: float
+
+    :param recorder: gets every direction chosen (see utils/replay.py)
+    :type recorder: replay.Recorder
+
+    :return: fitness and score reached in the game
+    :type: (float, int)
+    """
+
+    snake = Snake(
+                    BOARD_SIZE // 2,
+                    BOARD_SIZE // 2,
+                    0,
+                    GAME_WIN_WIDTH,
+                    0,
+                    GAME_WIN_HEIGHT
+                )
+    food = Food(
+                    0,
+                    GAME_WIN_WIDTH,
+                    0,
+                    GAME_WIN_HEIGHT,
+                    rng=random if seed is None else random.Random(seed),
+                    snake=snake
+                )
+
+    encoder = ObservationEncoder(features)
+
+    fitness = 0
+    score = 0
+    ticks = 0
+
+    # Packed states seen since the last food
+    visited = set()
+
+    while True:
+        fitness += 0.5
+        ticks += 1
+
+        outputs = net.activate(encoder.encode(snake, food))
+        direc = outputs.index(max(outputs))
+
+        if recorder is not None:
+            recorder.record(direc)
+
+        # Go Right / Left / Up / Down
+        if direc == 0:
+            snake.move_right()
+        if direc == 1:
+            snake.move_left()
+        if direc == 2:
+            snake.move_down()
+        if direc == 3:
+            snake.move_up()
+
+        snake.move()
+
+        starved = ticks >= timeout_ticks(snake.get_length(), timeout, timeout_per_block)
+
+        if snake.wall_collision() or snake.snake_collision() or starved:
+            fitness -= 2
+            return (fitness, score)
+
+        if food.eaten(snake):
+            fitness += 30
+            ticks = 0
+            score += 1
+
+            snake.grow()
+            visited.clear()
+
+            # Board full, the snake won
+            if not food.new(snake):
+                return (fitness, score)
+
+        elif loop_penalty is not None:
+            state = snake.state()
+            if state in visited:
+                fitness -= loop_penalty
+                return (fitness, score)
+
+            visited.add(state)
+
+
+def eval_episode(genome, config, episode=0, timeout=TIMEOUT_TICKS, timeout_per_block=TIMEOUT_TICKS_PER_BLOCK, features='classic', loop_penalty=LOOP_PENALTY):
+    """
+    Fitness of one episode of a single genome (seeds given by record_seeds)
+
+    :param episode: index of the episode, picks the food stream
+    :type episode: int
+
+    :return: fitness reached in the episode
+    :type: float
+    """
+
+    net = compiled_net.create(genome, config)
+    (fitness, _) = play_episode(net, timeout, timeout_per_block, features, episode_seed(genome, episode), loop_penalty)
+
+    return fitness
+
+
+def cut_off(fitness, remaining, cutoff=None, known=()):
+    """
+    Genomes worth another episode: those whose running fitness reaches the
+    given percentile of the whole generation's (genomes already stopped
+    included)
+
+    :param fitness: running fitness of every genome being evaluated
+    :type fitness: float[]
+
+    :param known: fitness of the rest of the generation, not evaluated
+                  again (FitnessCache hits)
+    :type known: float[]
+
+    :param remaining: indices of the genomes still playing
+    :type remaining: int[]
+
+    :param cutoff: percentile to reach (0 - 100), None plays every episode
+    :type cutoff: float
+
+    :return: indices of the genomes to keep playing
+    :type: int[]
+    """
+
+    if cutoff is None:
+        return remaining
+
+    threshold = np.percentile(np.concatenate([fitness, known]), cutoff)
+
+    return [i for i in remaining if fitness[i] >= threshold]
+
+
+def record_episodes(genomes, played, episodes):
+    """
+    Store how many episodes every genome played as genome.episodes and
+    whether the cut-off stopped it early as genome.cut_off
+
+    :return: None
+    """
+
+    for (_, genome), n in zip(genomes, played):
+        genome.episodes = int(n)
+        genome.cut_off = n < episodes
+
+
+def eval_genomes(genomes, config, timeout=TIMEOUT_TICKS, timeout_per_block=TIMEOUT_TICKS_PER_BLOCK, features='classic', seed=None, episodes=1, cutoff=None, pool=None, loop_penalty=LOOP_PENALTY, known=()):
+    """
+    Fitness function for neat.Population.run, evaluating every genome headless
+    (bind the settings with functools.partial)
+
+    Every genome plays up to the given number of episodes and its fitness is
+    the mean of the episodes played. Episodes are played in rounds, after each
+    one the genomes below the cut-off percentile of the generation stop.
+
+    :param episodes: games played by every genome
+    :type episodes: int
+
+    :param cutoff: percentile of the generation a genome's running fitness
+                   must reach to play its next episode, None to play all
+    :type cutoff: float
+
+    :param pool: multiprocessing.Pool (or ThreadPool) playing the episodes of
+                 a round in parallel, None to play them here
+    :type pool: multiprocessing.pool.Pool
+
+    :param loop_penalty: fitness lost by a snake going in circles, None to
+                         let it loop until it starves
+    :type loop_penalty: float
+
+    :param known: fitness of the genomes of the generation left out of
+                  genomes, counted in the cut-off percentile
+    :type known: float[]
+
+    :return: None
+    """
+
+    genomes = list(genomes)
+    record_seeds(genomes, seed)
+
+    total = [0.0] * len(genomes)
+    played = [0] * len(genomes)
+    fitness = [0.0] * len(genomes)
+
+    remaining = list(range(len(genomes)))
+    for episode in range(episodes):
+        jobs = [(genomes[i][1], config, episode, timeout, timeout_per_block, features, loop_penalty) for i in remaining]
+        if pool is None:
+            results = [eval_episode(*job) for job in jobs]
+        else:
+            results = pool.starmap(eval_episode, jobs)
+
+        for i, f in zip(remaining, results):
+            total[i] += f
+            played[i] += 1
+            fitness[i] = total[i] / played[i]
+
+        remaining = cut_off(fitness, remaining, cutoff, known)
+
+    for (_, genome), f in zip(genomes, fitness):
+        genome.fitness = f
+    record_episodes(genomes, played, episodes)
@@ -0,0 +1,101 @@
+"""
+Fitness cache
+
+Elitism carries genomes into the next generation unchanged, so under a seeded
+(deterministic) evaluation their fitness is already known: same genes, same
+episode seed, same games. FitnessCache wraps a fitness function for
+neat.Population.run and only hands it the genomes whose genes, episode seed
+and evaluation settings it has not seen, keeping the most recently used
+results up to a size bound.
+"""
+
+import hashlib
+import collections
+
+from utils.evaluate import genome_seed, record_seeds
+
+# Results kept before the least recently used one is dropped
+CACHE_SIZE = 10000
+
+
+def genome_hash(genome):
+    """
+    Digest of everything a network is built from: node genes and enabled
+    connection genes. Genome keys are left out, equal genes score the same.
+
+    :return: hex digest
+    :type: str
+    """
+
+    nodes = sorted(
+        (key, node.bias, node.response, node.activation, node.aggregation)
+        for key, node in genome.nodes.items()
+    )
+    connections = sorted(
+        (key, conn.weight)
+        for key, conn in genome.connections.items() if conn.enabled
+    )
+
+    return hashlib.sha1(repr((nodes, connections)).encode()).hexdigest()
+
+
+class FitnessCache:
+    def __init__(self, fitness_function, seed, settings=(), size=CACHE_SIZE):
+        """
+        :param fitness_function: fitness function for neat.Population.run,
+                                 also given the fitness of the cached genomes
+                                 as known (for the cut-off percentile)
+        :type fitness_function: function(genomes, config, known)
+
+        :param seed: master seed of the run, a genome's key holds the seed
+                     of its own games
+        :type seed: int
+
+        :param settings: everything else the fitness depends on (timeouts,
+                         feature set, backend), part of every key
+        :type settings: tuple
+
+        :param size: most results kept
+        :type size: int
+        """
+
+        self.fitness_function = fitness_function
+        self.seed = seed
+        self.settings = tuple(settings)
+        self.size = size
+        self.results = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, genome):
+        return (genome_hash(genome), genome_seed(self.seed, genome.key)) + self.settings
+
+    def __call__(self, genomes, config):
+        record_seeds(genomes, self.seed)
+
+        # Reuse what is known, evaluate the rest in one call
+        pending = []
+        known = []
+        for genome_id, genome in genomes:
+            key = self.key(genome)
+            if key in self.results:
+                self.results.move_to_end(key)
+                genome.fitness = self.results[key]
+                known.append(genome.fitness)
+                self.hits += 1
+            else:
+                pending.append((genome_id, genome, key))
+
+        self.misses += len(pending)
+        if pending:
+            self.fitness_function([(genome_id, genome) for genome_id, genome, _ in pending], config, known=known)
+
+        for _, genome, key in pending:
+            # Stopped early by the cut-off: a partial mean, play it again
+            if getattr(genome, 'cut_off', False):
+                continue
+
+            self.results[key] = genome.fitness
+            if len(self.results) > self.size:
+                self.results.popitem(last=False)
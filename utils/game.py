@@ -0,0 +1,287 @@
+"""
+Snake and Food game model
+
+Shared by the displayed games in snake.py and the headless evaluation in
+utils/evaluate.py. Positions are integer cells on a BOARD_SIZE x BOARD_SIZE
+board, pixels only come into play when drawing.
+"""
+
+import random
+import bisect
+import collections
+import pygame
+
+# Cells per side of every board (600 pixel game area / 30 pixel cells)
+BOARD_SIZE = 20
+# Pixels per cell when a board fills the game area
+CELL_SIZE = 30
+
+# Index of every direction in packed states (network output order)
+HEADINGS = {"Right": 0, "Left": 1, "Down": 2, "Up": 3}
+
+class Snake:
+    def __init__(self, x, y, wb, we, hb, he, ratio=1):
+        # Starting with 3 blocks, head at the given cell facing up
+        # (head first, a move pushes a new head and pops the tail)
+        self.body = collections.deque([
+                    (x, y),
+                    (x, y + 1),
+                    (x, y + 2)
+                ])
+
+        # How many blocks sit on each cell, kept up to date on move
+        self.occupied = collections.Counter(self.body)
+
+        # Sorted x of the blocks on every row and y on every column, so the
+        # closest block in each direction is a bisection away (and the free
+        # cells of a column are counted without scanning it)
+        self.rows = [[] for _ in range(BOARD_SIZE)]
+        self.cols = [[] for _ in range(BOARD_SIZE)]
+        for cell in self.body:
+            self.index_add(cell)
+
+        # Blocks still to be added, a move skips popping the tail while > 0
+        self.growth = 0
+
+        # snake direction
+        self.direction = "Up"
+
+        # Chosen to be enlarged
+        self.chosen = False
+
+        # block dimensions in pixels (drawing only)
+        self.ratio = ratio
+        self.cell_size = CELL_SIZE / ratio
+        self.width_end = we
+        self.height_end = he
+        self.width_begin = wb
+        self.height_begin = hb
+
+    def move_right(self):
+        self.direction = "Right"
+
+    def move_left(self):
+        self.direction = "Left"
+
+    def move_up(self):
+        self.direction = "Up"
+
+    def move_down(self):
+        self.direction = "Down"
+
+    def move(self):
+        (x, y) = self.body[0]
+
+        if self.direction == "Up":
+            y -= 1
+
+        if self.direction == "Down":
+            y += 1
+
+        if self.direction == "Right":
+            x += 1
+
+        if self.direction == "Left":
+            x -= 1
+
+        # Head enters its cell
+        self.body.appendleft((x, y))
+        self.occupied[(x, y)] += 1
+        self.index_add((x, y))
+
+        # Tail leaves its cell unless the snake is growing
+        if self.growth > 0:
+            self.growth -= 1
+        else:
+            tail = self.body.pop()
+            self.index_remove(tail)
+            self.occupied[tail] -= 1
+            if not self.occupied[tail]:
+                del self.occupied[tail]
+
+    def index_add(self, cell):
+        (x, y) = cell
+        if 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE:
+            bisect.insort(self.rows[y], x)
+            bisect.insort(self.cols[x], y)
+
+    def index_remove(self, cell):
+        (x, y) = cell
+        if 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE:
+            row = self.rows[y]
+            del row[bisect.bisect_left(row, x)]
+            col = self.cols[x]
+            del col[bisect.bisect_left(col, y)]
+
+    def wall_collision(self):
+        (x, y) = self.body[0]
+        return not (0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE)
+
+    def snake_collision(self):
+        # Head shares its cell with another block
+        return self.occupied[self.body[0]] > 1
+
+    def get_last_block(self):
+        return self.body[-1]
+
+    def get_coord_head(self):
+        return self.body[0]
+
+    def get_body(self):
+        return self.body
+
+    def get_length(self):
+        return len(self.body)
+
+    def get_w_h(self):
+        return (self.width_end, self.height_end, self.width_begin, self.height_begin)
+
+    def get_ratio(self):
+        return self.ratio
+
+    def get_chosen(self):
+        return self.chosen
+
+    def set_chosen(self, c):
+        self.chosen = c
+
+    def grow(self):
+        # Block is added behind the tail on the next move
+        self.growth += 1
+
+    def state(self):
+        # Head, direction and length packed in one int (loop detection)
+        (x, y) = self.body[0]
+        return ((len(self.body) * 4 + HEADINGS[self.direction]) * BOARD_SIZE + y) * BOARD_SIZE + x
+
+    def is_occupied(self, x, y):
+        return (x, y) in self.occupied
+
+    def count_free(self):
+        # Cells not covered by the snake (no two blocks share a cell while it lives)
+        return BOARD_SIZE * BOARD_SIZE - sum(len(col) for col in self.cols)
+
+    def free_cell(self, n):
+        """
+        n-th cell not covered by the snake in (x, y) order, found by walking
+        the columns instead of listing the free cells
+
+        :return: cell
+        :type: (int, int)
+        """
+
+        for x in range(BOARD_SIZE):
+            col = self.cols[x]
+            free = BOARD_SIZE - len(col)
+            if n >= free:
+                n -= free
+                continue
+
+            # n-th y missing from the sorted column
+            y = n
+            for block in col:
+                if block > y:
+                    break
+                y += 1
+
+            return (x, y)
+
+    def dis_to_snake_or_wall(self):
+        (headx, heady) = self.body[0]
+        row = self.rows[heady]
+        col = self.cols[headx]
+
+        # Closest block on each side of the head (head itself excluded)
+        before = bisect.bisect_left(row, headx)
+        after = bisect.bisect_right(row, headx)
+        left = headx - row[before - 1] if before > 0 else headx
+        right = row[after] - headx if after < len(row) else BOARD_SIZE - headx
+
+        before = bisect.bisect_left(col, heady)
+        after = bisect.bisect_right(col, heady)
+        top = heady - col[before - 1] if before > 0 else heady
+        bottom = col[after] - heady if after < len(col) else BOARD_SIZE - heady
+
+        return (right, left, bottom, top)
+
+    def draw(self, win):
+        for (x, y) in self.body:
+            pygame.draw.rect(win, (255, 255, 255), (
+                                                    self.width_begin + x * self.cell_size,
+                                                    self.height_begin + y * self.cell_size,
+                                                    self.cell_size,
+                                                    self.cell_size
+                                                ))
+
+    def draw_enlarged(self, win):
+        for (x, y) in self.body:
+            pygame.draw.rect(win, (255, 255, 255), (x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE))
+
+class Food:
+    def __init__(self, wb, we, hb, he, ratio=1, rng=random, snake=None):
+        # Source of food positions (random.Random for a seeded game)
+        self.rng = rng
+
+        # block dimensions in pixels (drawing only)
+        self.ratio = ratio
+        self.cell_size = CELL_SIZE / ratio
+        self.width_end = we
+        self.height_end = he
+        self.width_begin = wb
+        self.height_begin = hb
+
+        # False once the snake covers the whole board (nowhere left to go)
+        self.placed = True
+
+        # First food on a cell the snake leaves free (any cell without a snake)
+        if snake is not None:
+            self.new(snake)
+        else:
+            self.x = self.rng.randrange(BOARD_SIZE)
+            self.y = self.rng.randrange(BOARD_SIZE)
+
+    def new(self, snake):
+        """
+        Move the food to a random cell not covered by the snake, picked from
+        the free cells in (x, y) order so a seed gives the same food as
+        utils/batch_env.py
+
+        :return: False if the board is full, the snake won
+        :type: bool
+        """
+
+        free = snake.count_free()
+        if not free:
+            self.placed = False
+            return False
+
+        # Same draw as rng.choice over the list of free cells
+        (self.x, self.y) = snake.free_cell(self.rng.randrange(free))
+
+        return True
+
+    def eaten(self, snake):
+        (snakex, snakey) = snake.get_coord_head()
+        return self.x == snakex and self.y == snakey
+
+    def distance_to_food(self, snake):
+        (headx, heady) = snake.get_coord_head()
+
+        return (self.x - headx, self.y - heady)
+
+    def draw(self, win):
+        if not self.placed:
+            return
+
+        pygame.draw.rect(win, (255, 0, 0), (
+                                            self.width_begin + self.x * self.cell_size,
+                                            self.height_begin + self.y * self.cell_size,
+                                            self.cell_size,
+                                            self.cell_size
+                                        ))
+
+    def draw_enlarged(self, win):
+        if not self.placed:
+            return
+
+        pygame.draw.rect(win, (255, 0, 0), (self.x * CELL_SIZE, self.y * CELL_SIZE, CELL_SIZE, CELL_SIZE))
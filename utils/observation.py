@@ -0,0 +1,237 @@
+"""
+Network input encoders
+
+Turns the state of a snake into network inputs. A feature set is a list of
+features, each with a version reading one Snake / Food pair (main_ai and the
+headless evaluator) and a vectorised version reading every snake of a
+BatchSnakeEnv in one pass. Both give the same numbers.
+
+Features:
+    classic    head x / y, food dx / dy and closest block or wall to the
+               right / left / down / up, all in cells (8)
+    position   head x / y and food dx / dy, normalised to the board (4)
+    rays8      per ray in 8 directions: 1 / distance to the wall,
+               1 / distance to the closest block (0 if none), food on the ray (24)
+    rays16     the same with 16 directions (48)
+    direction  one-hot of the direction the snake is heading (4)
+    tail       one-hot of the direction the tail is moving (4)
+"""
+
+import numpy as np
+
+from utils.game import BOARD_SIZE
+
+# Direction order of the network outputs: Right / Left / Down / Up
+DIRECTION_NAMES = ["Right", "Left", "Down", "Up"]
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+RAYS8 = DIRECTIONS + [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+RAYS16 = RAYS8 + [(2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)]
+
+# Named feature sets, num_inputs of the NEAT config must match their size
+FEATURE_SETS = {
+    'classic': ['classic'],
+    'vision8': ['position', 'rays8', 'direction', 'tail'],
+    'vision16': ['position', 'rays16', 'direction', 'tail'],
+}
+
+
+# -----------------------------------------------------------------------------
+# One snake
+# -----------------------------------------------------------------------------
+def classic(snake, food):
+    (headx, heady) = snake.get_coord_head()
+    (food_distance_x, food_distance_y) = food.distance_to_food(snake)
+    (right, left, down, up) = snake.dis_to_snake_or_wall()
+
+    return [headx, heady, food_distance_x, food_distance_y, right, left, down, up]
+
+
+def position(snake, food):
+    (headx, heady) = snake.get_coord_head()
+    (food_distance_x, food_distance_y) = food.distance_to_food(snake)
+    scale = BOARD_SIZE - 1
+
+    return [headx / scale, heady / scale, food_distance_x / scale, food_distance_y / scale]
+
+
+def rays(snake, food, directions):
+    (headx, heady) = snake.get_coord_head()
+
+    features = []
+    for (dx, dy) in directions:
+        (x, y) = (headx + dx, heady + dy)
+        steps = 1
+        body = 0.0
+        seen = 0.0
+
+        # March until the ray leaves the board
+        while 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE:
+            if not body and snake.is_occupied(x, y):
+                body = 1.0 / steps
+            if x == food.x and y == food.y:
+                seen = 1.0
+
+            x += dx
+            y += dy
+            steps += 1
+
+        features += [1.0 / steps, body, seen]
+
+    return features
+
+
+def direction(snake, food):
+    one_hot = [0.0] * 4
+    one_hot[DIRECTION_NAMES.index(snake.direction)] = 1.0
+
+    return one_hot
+
+
+def tail(snake, food):
+    body = snake.get_body()
+    (tailx, taily) = body[-1]
+    (nextx, nexty) = body[-2]
+
+    one_hot = [0.0] * 4
+    one_hot[DIRECTIONS.index((nextx - tailx, nexty - taily))] = 1.0
+
+    return one_hot
+
+
+# -----------------------------------------------------------------------------
+# Every snake of a BatchSnakeEnv
+# -----------------------------------------------------------------------------
+def classic_batch(env):
+    ar = np.arange(env.n)
+    heads = env.heads()
+    headx = heads[:, 0]
+    heady = heads[:, 1]
+    cells = np.arange(BOARD_SIZE)
+
+    # Clip so dead snakes off the board still index the grid
+    row = env.occupied[ar, np.clip(heady, 0, BOARD_SIZE - 1), :]
+    col = env.occupied[ar, :, np.clip(headx, 0, BOARD_SIZE - 1)]
+
+    # Closest body block on each side, wall distance IF NO SNAKE
+    left_block = np.where(row & (cells < headx[:, None]), cells, -1).max(axis=1)
+    right_block = np.where(row & (cells > headx[:, None]), cells, BOARD_SIZE).min(axis=1)
+    up_block = np.where(col & (cells < heady[:, None]), cells, -1).max(axis=1)
+    down_block = np.where(col & (cells > heady[:, None]), cells, BOARD_SIZE).min(axis=1)
+
+    left = np.where(left_block >= 0, headx - left_block, headx)
+    right = right_block - headx
+    up = np.where(up_block >= 0, heady - up_block, heady)
+    down = down_block - heady
+
+    return np.stack((
+        headx,
+        heady,
+        env.food[:, 0] - headx,
+        env.food[:, 1] - heady,
+        right,
+        left,
+        down,
+        up
+    ), axis=1)
+
+
+def position_batch(env):
+    heads = env.heads()
+
+    return np.concatenate((heads, env.food - heads), axis=1) / (BOARD_SIZE - 1)
+
+
+def rays_batch(env, directions):
+    ar = np.arange(env.n)
+    heads = env.heads()
+    steps = np.arange(1, BOARD_SIZE + 1)
+
+    # Every cell of every ray: (snakes, rays, steps, xy)
+    cells = heads[:, None, None, :] + steps[None, None, :, None] * np.array(directions)[None, :, None, :]
+    x = cells[..., 0]
+    y = cells[..., 1]
+
+    # Rays start inside the board, so the inside steps come first
+    inside = (x >= 0) & (x < BOARD_SIZE) & (y >= 0) & (y < BOARD_SIZE)
+    wall = 1.0 / (inside.sum(axis=2) + 1)
+
+    blocks = inside & env.occupied[
+        ar[:, None, None],
+        np.clip(y, 0, BOARD_SIZE - 1),
+        np.clip(x, 0, BOARD_SIZE - 1)
+    ]
+    body = np.where(blocks.any(axis=2), 1.0 / (blocks.argmax(axis=2) + 1), 0.0)
+
+    food = env.food[:, None, None, :]
+    seen = (inside & (x == food[..., 0]) & (y == food[..., 1])).any(axis=2)
+
+    return np.stack((wall, body, seen), axis=2).reshape(env.n, -1)
+
+
+def direction_batch(env):
+    return np.eye(4)[env.direction]
+
+
+def tail_batch(env):
+    ar = np.arange(env.n)
+    tail_index = (env.head_index - env.length + 1) % env.capacity
+    moving = env.body[ar, (tail_index + 1) % env.capacity] - env.body[ar, tail_index]
+
+    # Match the move against Right / Left / Down / Up
+    matches = (moving[:, None, :] == np.array(DIRECTIONS)[None, :, :]).all(axis=2)
+
+    return matches.astype(np.float64)
+
+
+# Name: (number of inputs, one snake, every snake of a BatchSnakeEnv)
+FEATURES = {
+    'classic': (8, classic, classic_batch),
+    'position': (4, position, position_batch),
+    'rays8': (3 * len(RAYS8), lambda snake, food: rays(snake, food, RAYS8), lambda env: rays_batch(env, RAYS8)),
+    'rays16': (3 * len(RAYS16), lambda snake, food: rays(snake, food, RAYS16), lambda env: rays_batch(env, RAYS16)),
+    'direction': (4, direction, direction_batch),
+    'tail': (4, tail, tail_batch),
+}
+
+
+class ObservationEncoder:
+    def __init__(self, feature_set='classic'):
+        self.feature_set = feature_set
+        self.features = [FEATURES[name] for name in FEATURE_SETS[feature_set]]
+        self.size = sum(size for size, _, _ in self.features)
+
+    def encode(self, snake, food):
+        """
+        Network inputs of one snake
+
+        :return: inputs
+        :type: float[]
+        """
+
+        inputs = []
+        for _, f, _ in self.features:
+            inputs += f(snake, food)
+
+        return inputs
+
+    def encode_batch(self, env):
+        """
+        Network inputs of every snake in a BatchSnakeEnv (dead ones included)
+
+        :return: inputs
+        :type: np.ndarray (n, size)
+        """
+
+        return np.concatenate([f(env) for _, _, f in self.features], axis=1).astype(np.float64)
+
+
+def num_inputs(feature_set):
+    """
+    Number of network inputs of a feature set
+
+    :return: inputs per observation
+    :type: int
+    """
+
+    return ObservationEncoder(feature_set).size
@@ -0,0 +1,408 @@
+"""
+Dirty rectangle rendering of the AI grid view
+
+Every frame of the grid used to clear the window, draw every block of every
+snake, every food, every score and every grid line and push the whole window
+to the screen. GridRenderer keeps what it drew last on every board (snake
+cells, food cell, score) and only repaints the cells that changed since: the
+new head, the freed tail, the moved food, a changed score. Erased cells are
+copied back from a cached background holding the grid lines, and only the
+rectangles touched are handed to pygame.display.update.
+
+ArrayRenderer draws the boards the other way round: every cell of every
+board goes into one NumPy array (one byte per cell, a palette index), which
+is copied onto a surface of one pixel per cell and scaled up onto the game
+area in one call. Its pygame cost does not depend on how many snakes
+there are or how long they are, it wins on busy grids.
+
+Fonts, rendered texts and translucent overlays are cached too:
+pygame.font.SysFont scans the installed fonts on every call, the same few
+strings (scores, labels) are rendered frame after frame and the shades over
+the hovered board and the pregame screen never change, so a steady frame
+allocates no surface.
+"""
+
+import math
+import itertools
+import collections
+
+import numpy as np
+import pygame
+
+from utils.game import BOARD_SIZE
+
+SNAKE_COLOR = (255, 255, 255)
+FOOD_COLOR = (255, 0, 0)
+LINE_COLOR = (255, 255, 255)
+
+# Palette of the cells drawn by ArrayRenderer, by index
+EMPTY = 0
+SNAKE = 1
+FOOD = 2
+PALETTE = [(0, 0, 0), SNAKE_COLOR, FOOD_COLOR]
+
+# Alpha of the shade over the board under the mouse
+HOVER_ALPHA = 150
+
+# Fonts by (name, size)
+fonts = {}
+
+# Rendered texts, least recently used dropped past TEXT_CACHE_SIZE
+TEXT_CACHE_SIZE = 512
+texts = collections.OrderedDict()
+
+# Translucent overlays by (size, alpha, color)
+OVERLAY_CACHE_SIZE = 16
+overlays = collections.OrderedDict()
+
+
+def font(name, size):
+    """
+    System font, loaded once per name and size
+
+    :return: font
+    :type: pygame.font.Font
+    """
+
+    f = fonts.get((name, size))
+    if f is None:
+        f = fonts[(name, size)] = pygame.font.SysFont(name, size)
+
+    return f
+
+
+def text(font, string, color=(255, 255, 255), antialias=1):
+    """
+    Surface of the rendered string, shared between callers (blit it, don't
+    draw on it)
+
+    :return: rendered text
+    :type: pygame.Surface
+    """
+
+    key = (font, string, color, antialias)
+    surface = texts.get(key)
+    if surface is None:
+        surface = texts[key] = font.render(string, antialias, color)
+        if len(texts) > TEXT_CACHE_SIZE:
+            texts.popitem(last=False)
+    else:
+        texts.move_to_end(key)
+
+    return surface
+
+
+def overlay(size, alpha, color=(0, 0, 0)):
+    """
+    Surface of the given size filled with a color at the given alpha,
+    shared between callers (blit it, don't draw on it)
+
+    :return: overlay
+    :type: pygame.Surface
+    """
+
+    key = (tuple(size), alpha, color)
+    surface = overlays.get(key)
+    if surface is None:
+        surface = pygame.Surface(key[0])
+        surface.fill(color)
+        surface.set_alpha(alpha)
+
+        overlays[key] = surface
+        if len(overlays) > OVERLAY_CACHE_SIZE:
+            overlays.popitem(last=False)
+    else:
+        overlays.move_to_end(key)
+
+    return surface
+
+
+class Board:
+    """
+    What is on screen in one block of the grid
+    """
+
+    def __init__(self, rect):
+        self.rect = rect
+        self.cells = set()
+        self.food = None
+        self.score = None
+        self.text_rect = pygame.Rect(rect.topleft, (0, 0))
+
+
+class GridRenderer:
+    def __init__(self, size, game_size, blocks):
+        """
+        :param size: window width and height
+        :type size: (int, int)
+
+        :param game_size: width and height of the game area, left of the info panel
+        :type game_size: (int, int)
+
+        :param blocks: number of boards in the grid (a square)
+        :type blocks: int
+        """
+
+        self.size = size
+        self.game_size = game_size
+        self.blocks = blocks
+        self.side = int(math.sqrt(blocks))
+
+        self.font = font("comicsans", int(50 / math.sqrt(blocks)))
+
+        # Grid lines and the info separator, drawn once
+        self.background = pygame.Surface(size)
+        self.background.fill((0, 0, 0))
+        self.draw_lines(self.background)
+
+        # Boards by top left corner, so a new generation reuses what is drawn
+        self.boards = {}
+        self.hovered = None
+
+        # Numbers shown in the info panel, drawn by the caller
+        self.panel = None
+
+        # Next frame repaints the whole window
+        self.full = True
+
+    def invalidate(self):
+        self.full = True
+
+    def draw_lines(self, win):
+        (width, height) = self.game_size
+        step_x = width / math.sqrt(self.blocks)
+        step_y = height / math.sqrt(self.blocks)
+
+        for i in range(1, self.side):
+            pygame.draw.line(win, LINE_COLOR, (i * step_x, 0), (i * step_x, height))
+            pygame.draw.line(win, LINE_COLOR, (0, i * step_y), (width, i * step_y))
+
+        # information seperator
+        pygame.draw.line(win, LINE_COLOR, (width, 0), (width, height))
+
+    def draw(self, win, snakes, foods, scores, hovered=None):
+        """
+        Bring the boards on win up to date
+
+        :param hovered: index of the snake under the mouse, its board is shaded
+        :type hovered: int
+
+        :return: rectangles changed, None if the whole window changed
+        :type: pygame.Rect[]
+        """
+
+        full = self.full
+        if full:
+            win.blit(self.background, (0, 0))
+            self.boards = {}
+            self.full = False
+
+        dirty = []
+        seen = set()
+        hovered_key = None
+
+        for i in range(len(snakes)):
+            snake = snakes[i]
+            (we, he, wb, hb) = snake.get_w_h()
+            key = (wb, hb)
+            seen.add(key)
+
+            board = self.boards.get(key)
+            if board is None:
+                board = self.boards[key] = Board(pygame.Rect(wb, hb, we - wb, he - hb))
+
+            if i == hovered:
+                hovered_key = key
+
+            # Shaded now or last frame, shading needs the whole board redrawn
+            if i == hovered or key == self.hovered:
+                self.redraw(win, board, snake, foods[i], scores[i], board.rect)
+                if i == hovered:
+                    win.blit(overlay(board.rect.size, HOVER_ALPHA), board.rect.topleft)
+                dirty.append(board.rect)
+            else:
+                self.update(win, board, snake, foods[i], scores[i], dirty)
+
+        # Boards whose snake died go blank
+        for key in list(self.boards):
+            if key not in seen:
+                board = self.boards.pop(key)
+                win.blit(self.background, board.rect, board.rect)
+                dirty.append(board.rect)
+
+        self.hovered = hovered_key
+
+        # Lines go over everything, only the dirty parts reach the screen
+        self.draw_lines(win)
+
+        return None if full else dirty
+
+    def cell_rect(self, snake, cell):
+        (x, y) = cell
+        return pygame.Rect(
+            snake.width_begin + x * snake.cell_size,
+            snake.height_begin + y * snake.cell_size,
+            snake.cell_size,
+            snake.cell_size
+        )
+
+    def cells(self, snake):
+        # Live snakes are on the board, every covered cell is drawn
+        return set(snake.occupied)
+
+    def update(self, win, board, snake, food, score, dirty):
+        cells = self.cells(snake)
+        changed = []
+
+        for cell in board.cells - cells:
+            rect = self.cell_rect(snake, cell)
+            win.blit(self.background, rect, rect)
+            changed.append(rect)
+
+        for cell in cells - board.cells:
+            rect = self.cell_rect(snake, cell)
+            pygame.draw.rect(win, SNAKE_COLOR, rect)
+            changed.append(rect)
+
+        food_cell = (food.x, food.y) if food.placed else None
+        if food_cell != board.food:
+            if board.food is not None and board.food not in cells:
+                rect = self.cell_rect(snake, board.food)
+                win.blit(self.background, rect, rect)
+                changed.append(rect)
+
+            if food_cell is not None:
+                rect = self.cell_rect(snake, food_cell)
+                pygame.draw.rect(win, FOOD_COLOR, rect)
+                changed.append(rect)
+
+        board.cells = cells
+        board.food = food_cell
+        dirty += changed
+
+        # The score sits on top of the board, repaint it if anything under it changed
+        if score != board.score or board.text_rect.collidelist(changed) != -1:
+            (_, text_rect) = self.score_text(snake, score)
+            area = board.text_rect.union(text_rect)
+
+            self.redraw(win, board, snake, food, score, area)
+            dirty.append(area)
+
+    def redraw(self, win, board, snake, food, score, area):
+        """
+        Repaint one area of a board from scratch
+
+        :return: None
+        """
+
+        win.set_clip(area)
+        win.blit(self.background, area, area)
+
+        board.cells = self.cells(snake)
+        for cell in board.cells:
+            rect = self.cell_rect(snake, cell)
+            if rect.colliderect(area):
+                pygame.draw.rect(win, SNAKE_COLOR, rect)
+
+        board.food = (food.x, food.y) if food.placed else None
+        if board.food is not None:
+            pygame.draw.rect(win, FOOD_COLOR, self.cell_rect(snake, board.food))
+
+        (surface, board.text_rect) = self.score_text(snake, score)
+        board.score = score
+        win.blit(surface, board.text_rect)
+
+        win.set_clip(None)
+
+    def score_text(self, snake, score):
+        # Top right corner of the board
+        (we, _, _, hb) = snake.get_w_h()
+        margin = int(10 / snake.get_ratio())
+
+        surface = text(self.font, str(score), SNAKE_COLOR)
+
+        return (surface, surface.get_rect(topleft=(we - margin - surface.get_width(), hb + margin)))
+
+
+class ArrayRenderer(GridRenderer):
+    """
+    GridRenderer drawing the whole game area from an array of cells every
+    frame: one scale onto the window, plus the scores and grid lines on top
+    """
+
+    def __init__(self, size, game_size, blocks):
+        super().__init__(size, game_size, blocks)
+
+        # Palette index of every cell of every board, indexed [x, y] like
+        # pygame.surfarray
+        cells = self.side * BOARD_SIZE
+        self.grid = np.zeros((cells, cells), dtype=np.uint8)
+
+        # One pixel per cell in the window's pixel format, with the palette
+        # mapped to it (built on the first draw)
+        self.small = None
+        self.colors = None
+
+    def draw(self, win, snakes, foods, scores, hovered=None):
+        full = self.full
+        if full:
+            win.blit(self.background, (0, 0))
+            self.full = False
+
+        if self.small is None or self.small.get_bitsize() != win.get_bitsize():
+            self.small = pygame.Surface(self.grid.shape, 0, win)
+            self.colors = np.array([self.small.map_rgb(color) for color in PALETTE], dtype=np.uint32)
+
+        # Cells to pixels, scaled straight onto the game area
+        self.fill(snakes, foods)
+        pygame.surfarray.blit_array(self.small, self.colors[self.grid])
+        area = pygame.Rect((0, 0), self.game_size)
+        pygame.transform.scale(self.small, area.size, win.subsurface(area))
+
+        for i in range(len(snakes)):
+            win.blit(*self.score_text(snakes[i], scores[i]))
+
+            if i == hovered:
+                (we, he, wb, hb) = snakes[i].get_w_h()
+                rect = pygame.Rect(wb, hb, we - wb, he - hb)
+                win.blit(overlay(rect.size, HOVER_ALPHA), rect.topleft)
+
+        self.draw_lines(win)
+
+        return None if full else [area]
+
+    def origin(self, snake):
+        # First cell of the snake's board in the grid
+        return (round(snake.width_begin / snake.cell_size), round(snake.height_begin / snake.cell_size))
+
+    def fill(self, snakes, foods):
+        """
+        Palette index of every cell from the snakes and foods
+
+        :return: None
+        """
+
+        self.grid.fill(EMPTY)
+
+        # Every covered cell of every snake, moved to its board
+        lengths = [len(snake.occupied) for snake in snakes]
+        cells = itertools.chain.from_iterable(itertools.chain.from_iterable(snake.occupied for snake in snakes))
+        cells = np.fromiter(cells, dtype=np.intp, count=2 * sum(lengths)).reshape(-1, 2)
+        origins = np.array([self.origin(snake) for snake in snakes], dtype=np.intp).reshape(-1, 2)
+
+        # A head past the wall is not drawn on the next board
+        inside = ((cells >= 0) & (cells < BOARD_SIZE)).all(axis=1)
+        cells = (cells + np.repeat(origins, lengths, axis=0))[inside]
+        self.grid[cells[:, 0], cells[:, 1]] = SNAKE
+
+        placed = [i for i in range(len(foods)) if foods[i].placed]
+        if placed:
+            food = np.array([(foods[i].x, foods[i].y) for i in placed], dtype=np.intp) + origins[placed]
+            self.grid[food[:, 0], food[:, 1]] = FOOD
+
+
+# Grid renderers by name
+RENDERERS = {
+    'dirty': GridRenderer,
+    'array': ArrayRenderer,
+}
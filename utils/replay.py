@@ -0,0 +1,228 @@
+"""
+Episode replays
+
+A game of snake is fully determined by its food seed and the direction picked
+every tick, so a replay only stores those: a header (seed, genome key,
+generation, ticks, score, fitness) and the directions packed 2 bits each,
+zlib compressed in chunks of CHUNK_ACTIONS. Replaying steps a Snake / Food
+pair through the recorded directions, with the food drawn from the same seed.
+
+Replay or watch a file with:
+
+    python -m utils.replay FILE [--watch]
+"""
+
+import os
+import sys
+import zlib
+import random
+import struct
+import argparse
+
+import neat
+
+from utils import compiled_net
+from utils.game import Snake, Food, BOARD_SIZE, CELL_SIZE
+from utils.evaluate import GAME_WIN_WIDTH, GAME_WIN_HEIGHT, play_episode, episode_seed
+
+MAGIC = b"SNKR"
+# Version 2: food picked from the free cells in (x, y) order
+VERSION = 2
+
+# Magic, version, seed, genome key, generation, ticks, score, fitness
+HEADER = struct.Struct("<4sBQqIIId")
+# Compressed size in front of every chunk
+CHUNK_HEADER = struct.Struct("<I")
+
+# Directions per compressed chunk (4 per byte)
+CHUNK_ACTIONS = 16384
+
+
+class Recorder:
+    """
+    Packs the directions of one game as they are played, 4 to a byte
+    """
+
+    def __init__(self):
+        self.ticks = 0
+        self.buffer = bytearray()
+        self.chunks = []
+
+    def record(self, action):
+        shift = (self.ticks & 3) * 2
+        if shift == 0:
+            self.buffer.append(action)
+        else:
+            self.buffer[-1] |= action << shift
+
+        self.ticks += 1
+        if self.ticks % CHUNK_ACTIONS == 0:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.chunks.append(zlib.compress(bytes(self.buffer), 9))
+            self.buffer = bytearray()
+
+    def save(self, filename, seed, genome_key, generation=0, score=0, fitness=0.0):
+        """
+        Write the replay of the recorded game
+
+        :return: None
+        """
+
+        self.flush()
+
+        with open(filename, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, seed, genome_key, generation, self.ticks, score, fitness))
+            for chunk in self.chunks:
+                f.write(CHUNK_HEADER.pack(len(chunk)))
+                f.write(chunk)
+
+
+class Replay:
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            data = f.read()
+
+        (magic, version, self.seed, self.genome_key, self.generation, self.ticks, self.score, self.fitness) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} is not a version {} snake replay".format(filename, VERSION))
+
+        # Unpack every chunk, 4 directions per byte
+        self.actions = []
+        offset = HEADER.size
+        while offset < len(data):
+            (size,) = CHUNK_HEADER.unpack_from(data, offset)
+            offset += CHUNK_HEADER.size
+
+            for byte in zlib.decompress(data[offset:offset + size]):
+                self.actions += [byte & 3, (byte >> 2) & 3, (byte >> 4) & 3, byte >> 6]
+            offset += size
+
+        del self.actions[self.ticks:]
+
+    def frames(self):
+        """
+        Step the game through the recorded directions
+
+        :return: snake, food and score after every tick (the same objects,
+                 updated in place)
+        :type: generator of (Snake, Food, int)
+        """
+
+        snake = Snake(BOARD_SIZE // 2, BOARD_SIZE // 2, 0, GAME_WIN_WIDTH, 0, GAME_WIN_HEIGHT)
+        food = Food(0, GAME_WIN_WIDTH, 0, GAME_WIN_HEIGHT, rng=random.Random(self.seed), snake=snake)
+        moves = [snake.move_right, snake.move_left, snake.move_down, snake.move_up]
+        score = 0
+
+        for action in self.actions:
+            moves[action]()
+            snake.move()
+
+            if food.eaten(snake):
+                score += 1
+                snake.grow()
+                food.new(snake)
+
+            yield (snake, food, score)
+
+
+def record_episode(genome, config, filename, seed=None, generation=0, **settings):
+    """
+    Play one headless game of the genome and save its replay, settings are
+    passed on to play_episode (timeouts, features, loop penalty)
+
+    :param seed: food seed of the game, a random one if None
+    :type seed: int
+
+    :return: fitness and score of the game
+    :type: (float, int)
+    """
+
+    if seed is None:
+        seed = random.getrandbits(63)
+
+    recorder = Recorder()
+    net = compiled_net.create(genome, config)
+    (fitness, score) = play_episode(net, seed=seed, recorder=recorder, **settings)
+    recorder.save(filename, seed, genome.key, generation, score, fitness)
+
+    return (fitness, score)
+
+
+class ReplayReporter(neat.reporting.BaseReporter):
+    """
+    neat reporter saving a replay of every generation's champion into a
+    directory: its first evaluated game, played again from its episode seed
+    with the objects engine (the same game under --backend batch, both draw
+    food alike). Over several episodes the header holds that game's
+    fitness, not the champion's mean.
+    """
+
+    def __init__(self, directory, **settings):
+        self.directory = directory
+        self.settings = settings
+        self.generation = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def post_evaluate(self, config, population, species, best_genome):
+        seed = episode_seed(best_genome)
+
+        filename = os.path.join(self.directory, "gen-{:04d}-genome-{}.replay".format(self.generation, best_genome.key))
+        record_episode(best_genome, config, filename, seed, self.generation, **self.settings)
+
+
+def watch(replay, fps=15):
+    """
+    Draw a replay in a pygame window
+
+    :return: None
+    """
+
+    import pygame
+
+    pygame.init()
+    win = pygame.display.set_mode((BOARD_SIZE * CELL_SIZE, BOARD_SIZE * CELL_SIZE))
+    pygame.display.set_caption("Snake replay: genome {}, generation {}".format(replay.genome_key, replay.generation))
+    clock = pygame.time.Clock()
+
+    for (snake, food, _) in replay.frames():
+        clock.tick(fps)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+
+        win.fill((0, 0, 0))
+        snake.draw_enlarged(win)
+        food.draw_enlarged(win)
+        pygame.display.update()
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded snake game")
+    parser.add_argument("replay")
+    parser.add_argument("--watch", action="store_true", help="draw the game in a window")
+    parser.add_argument("--fps", type=int, default=15)
+    args = parser.parse_args()
+
+    replay = Replay(args.replay)
+    print("Genome {} (generation {}), seed {}: {} ticks, score {}, fitness {:.1f}".format(
+        replay.genome_key, replay.generation, replay.seed, replay.ticks, replay.score, replay.fitness))
+
+    if args.watch:
+        watch(replay, args.fps)
+    else:
+        score = 0
+        for (_, _, score) in replay.frames():
+            pass
+
+        print("Replayed score {}{}".format(score, "" if score == replay.score else " (MISMATCH)"))
+        sys.exit(score != replay.score)